@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for the obsidian_mv link rewriter.
+Compares the old per-link approach (extract the matching links, then
+str.replace each one over the whole note, once per renamed note) with the
+single-pass LinkRewriter on large synthetic notes.
+
+Usage:
+    python3 benchmarks/bench_link_rewriter.py
+    python3 benchmarks/bench_link_rewriter.py --links 5000 --renames 50 --repeat 5
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+repo_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(repo_dir / "utilities_data" / "obsidian_mv"))
+
+from link_rewriter import LinkRewriter, Rename
+
+
+def legacy_references(content: str, target_note: str):
+    """extract_link_references as it was before the single-pass rewriter."""
+    target_base = target_note.replace('.md', '') if target_note.endswith('.md') else target_note
+    matches = []
+    for match in re.finditer(r'(!?\[\[([^\]]+)\]\])', content):
+        link_inner = match.group(2)
+        if link_inner.startswith('## ') or link_inner.startswith('^^ ') or link_inner.startswith('#'):
+            continue
+        note_part = link_inner.split('|')[0].strip().split('#')[0].strip()
+        link_base = note_part.replace('.md', '') if note_part.endswith('.md') else note_part
+        link_base = link_base.lstrip('/')
+        if (link_base == target_base or link_base.endswith('/' + target_base)
+                or target_base.endswith('/' + link_base)):
+            matches.append(match.group(1))
+    return matches
+
+
+def legacy_rewrite(content: str, renames):
+    """One extract + str.replace-per-link pass per renamed note."""
+    for old_name, new_name in renames:
+        rename = Rename(old_name, new_name)
+        for link in legacy_references(content, old_name):
+            inner = link[3:-2] if link.startswith('!') else link[2:-2]
+            target = inner.split('|')[0].split('#')[0].strip()
+            content = content.replace(link, link.replace(target, rename.retarget(target), 1))
+    return content
+
+
+def make_note(links: int, renames: int, seed: int):
+    """A note with `links` links, a quarter of them to renamed notes, in varied forms."""
+    rng = random.Random(seed)
+    pairs = [(f"projects/topic {i}/note {i}.md", f"archive/topic {i}/note {i}.md") for i in range(renames)]
+    forms = ["[[{name}]]", "[[{path}]]", "![[{name}#Heading]]", "[[{name}|alias]]",
+             "[[{path}.md#^block]]", "[[/{path}]]"]
+    words = "lorem ipsum dolor sit amet consectetur adipiscing elit sed do".split()
+    parts = []
+    for i in range(links):
+        parts.append(' '.join(rng.choice(words) for _ in range(12)))
+        if rng.random() < 0.25 and pairs:
+            old = rng.choice(pairs)[0][:-3]
+            parts.append(rng.choice(forms).format(name=old.split('/')[-1], path=old))
+        else:
+            parts.append(f"[[unrelated note {rng.randrange(links)}]]")
+        if i % 8 == 7:
+            parts.append('\n\n')
+    return ' '.join(parts), pairs
+
+
+def best_time(func, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the obsidian_mv link rewriter.")
+    parser.add_argument('--links', type=int, nargs='+', default=[1000, 5000, 20000],
+                        help='Links per note (one run per value)')
+    parser.add_argument('--renames', type=int, default=20, help='Notes renamed in one batch')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement (best is reported)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for the generated notes')
+    args = parser.parse_args()
+
+    print(f"{'links':>7} {'size':>9} {'legacy':>10} {'single-pass':>12} {'speedup':>8} {'links/s':>12}")
+    for links in args.links:
+        content, pairs = make_note(links, args.renames, args.seed)
+        rewriter = LinkRewriter(pairs)
+
+        new_content, _ = rewriter.rewrite(content)
+        if legacy_rewrite(content, pairs) != new_content:
+            print(f"warning: legacy and single-pass output differ for {links} links", file=sys.stderr)
+
+        legacy = best_time(lambda: legacy_rewrite(content, pairs), args.repeat)
+        single = best_time(lambda: rewriter.rewrite(content), args.repeat)
+        size_kb = len(content.encode('utf-8')) / 1024
+        print(f"{links:>7} {size_kb:>7.0f}KB {legacy * 1000:>8.1f}ms {single * 1000:>10.1f}ms "
+              f"{legacy / single:>7.1f}x {links / single:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
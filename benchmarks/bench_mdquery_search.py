@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for mdquery's indexed search.
+Runs compound queries (property + tag + text) over synthetic frontmatter for
+large collections, comparing the old linear filters and list intersection
+with SearchIndex: cold (first query, indexes built on the way) and warm.
+
+Usage:
+    python3 benchmarks/bench_mdquery_search.py
+    python3 benchmarks/bench_mdquery_search.py --notes 100000 --legacy-max 0
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+repo_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(repo_dir / "utilities_data" / "mdquery"))
+
+from search_index import SearchIndex
+
+SOURCES = ['youtube', 'podcast', 'article', 'book', 'paper']
+TAGS = ['ai', 'python', 'wildlife', 'history', 'music', 'science', 'travel', 'cooking', 'finance', 'health']
+WORDS = ('grizzly bear salmon river machine learning neural network python programming '
+         'ancient rome empire jazz piano recipe bread market risk sleep study').split()
+
+QUERIES = [
+    ('property', [('source', 'youtube')], None, None),
+    ('property+tag', [('source', 'youtube')], ['python'], None),
+    ('property+tag+text', [('source', 'youtube')], ['python', 'ai'], 'neural net'),
+    ('text only', [], None, 'grizzly bear'),
+]
+
+
+def make_files_data(notes: int, seed: int):
+    rng = random.Random(seed)
+    files_data = []
+    for i in range(notes):
+        files_data.append({
+            'file_path': f"/vault/notes/note {i}.md",
+            'relative_path': f"notes/note {i}.md",
+            'yaml_data': {
+                'title': ' '.join(rng.choice(WORDS) for _ in range(5)),
+                'source': rng.choice(SOURCES),
+                'ai_tags': rng.sample(TAGS, 3),
+                'status': rng.choice(['done', 'todo']),
+                'rating': rng.randint(1, 5),
+                'summary': ' '.join(rng.choice(WORDS) for _ in range(20)),
+            }
+        })
+    return files_data
+
+
+def legacy_query(files_data, property_filters, tags, search_text):
+    """The filters and list intersection mdquery used before SearchIndex."""
+    results = files_data
+    if property_filters:
+        results = [f for f in files_data if all(
+            key in f['yaml_data'] and (value in [str(v) for v in f['yaml_data'][key]]
+                                       if isinstance(f['yaml_data'][key], list)
+                                       else str(f['yaml_data'][key]) == value)
+            for key, value in property_filters)]
+    if tags:
+        tag_results = [f for f in files_data if isinstance(f['yaml_data'].get('ai_tags'), list)
+                       and all(tag in f['yaml_data']['ai_tags'] for tag in tags)]
+        results = tag_results if results is files_data else [f for f in results if f in tag_results]
+    if search_text:
+        needle = search_text.lower()
+        text_results = [f for f in files_data if any(
+            (isinstance(v, str) and needle in v.lower()) or
+            (isinstance(v, list) and any(isinstance(i, str) and needle in i.lower() for i in v))
+            for v in f['yaml_data'].values())]
+        results = text_results if results is files_data else [f for f in results if f in text_results]
+    return results
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark mdquery's indexed search.")
+    parser.add_argument('--notes', type=int, nargs='+', default=[10000, 100000],
+                        help='Collection sizes (one run per value)')
+    parser.add_argument('--legacy-max', type=int, default=20000,
+                        help='Skip the legacy (quadratic) queries above this many notes')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for the generated frontmatter')
+    args = parser.parse_args()
+
+    for notes in args.notes:
+        files_data = make_files_data(notes, args.seed)
+        print(f"\n{notes:,} notes")
+        print(f"  {'query':<20} {'matches':>8} {'legacy':>10} {'cold':>10} {'warm':>10} {'warm+text index':>16}")
+
+        cold_index = SearchIndex(files_data)
+        text_index = SearchIndex(files_data, index_text=True)
+        _, build = timed(lambda: text_index.query([], None, 'warm up'))
+        for _, property_filters, tags, _ in QUERIES:
+            text_index.query(property_filters, tags)
+        for name, property_filters, tags, search_text in QUERIES:
+            result, cold = timed(lambda: cold_index.query(property_filters, tags, search_text))
+            _, warm = timed(lambda: cold_index.query(property_filters, tags, search_text))
+            indexed, warm_text = timed(lambda: text_index.query(property_filters, tags, search_text))
+            if indexed != result:
+                print(f"warning: text index disagrees on '{name}'", file=sys.stderr)
+
+            legacy_ms = '-'
+            if notes <= args.legacy_max:
+                expected, legacy = timed(lambda: legacy_query(files_data, property_filters, tags, search_text))
+                if expected != result:
+                    print(f"warning: legacy and indexed results differ on '{name}'", file=sys.stderr)
+                legacy_ms = f"{legacy * 1000:.1f}ms"
+            print(f"  {name:<20} {len(result):>8} {legacy_ms:>10} {cold * 1000:>8.1f}ms "
+                  f"{warm * 1000:>8.1f}ms {warm_text * 1000:>14.1f}ms")
+        print(f"  (text index build: {build * 1000:.0f}ms, paid once per scan)")
+
+
+if __name__ == "__main__":
+    main()
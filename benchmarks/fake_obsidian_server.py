@@ -0,0 +1,503 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Obsidian Local REST API, serving a vault folder.
+Implements what the utilities use: /vault/ (GET notes and folder listings,
+note+json, PUT, DELETE, PATCH replacing a heading's section), /search/ with JsonLogic or a Dataview
+`LIST FROM [[note]]` query, and /search/simple/. Every response can be
+delayed by a fixed latency to mimic a remote or busy Obsidian, and the
+server counts requests and bytes per endpoint so benchmarks can report
+how chatty each tool is.
+
+Usage:
+    python3 benchmarks/fake_obsidian_server.py /tmp/vault --port 27124 --latency-ms 5
+"""
+
+import argparse
+import fnmatch
+import json
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlparse
+
+import yaml
+
+API_KEY = 'benchmark-key'
+NOTE_JSON = 'application/vnd.olrapi.note+json'
+INLINE_TAG = re.compile(r'(?<![\w#])#([\w/-]+)')
+DATAVIEW_FROM = re.compile(r'FROM\s+\[\[(.+?)\]\]')
+HEADING = re.compile(r'^(#{1,6})[ \t]+(.*?)[ \t]*$')
+FENCE = re.compile(r'^ {0,3}(```|~~~)')
+
+
+def heading_section(content: str, target: str) -> Optional[Tuple[int, int]]:
+    """
+    Character span of the section under a heading, given its '::'-joined
+    path: from after the heading line to the next heading of the same or a
+    higher level.
+    """
+    lines = content.splitlines(keepends=True)
+    offset = 0
+    path: List[Tuple[int, str]] = []
+    found = None
+    in_fence = False
+    for line in lines:
+        text = line.rstrip('\r\n')
+        if FENCE.match(text):
+            in_fence = not in_fence
+        match = None if in_fence else HEADING.match(text)
+        if match:
+            level = len(match.group(1))
+            if found and level <= found[0]:
+                return found[1], offset
+            while path and path[-1][0] >= level:
+                path.pop()
+            path.append((level, match.group(2)))
+            if not found and '::'.join(name for _, name in path) == target:
+                found = (level, offset + len(line))
+        offset += len(line)
+    return (found[1], len(content)) if found else None
+
+
+# JsonLogic, with the loose semantics of json-logic-js that the plugin uses
+
+def truthy(value) -> bool:
+    if isinstance(value, list):
+        return len(value) > 0
+    return bool(value)
+
+
+def loose_equals(a, b) -> bool:
+    if type(a) == type(b):
+        return a == b
+    if isinstance(a, bool) or isinstance(b, bool):
+        a = float(a) if isinstance(a, bool) else a
+        b = float(b) if isinstance(b, bool) else b
+    if isinstance(a, (int, float)) and isinstance(b, str):
+        try:
+            return a == float(b)
+        except ValueError:
+            return False
+    if isinstance(b, (int, float)) and isinstance(a, str):
+        return loose_equals(b, a)
+    if isinstance(a, list) and isinstance(b, str):
+        return ','.join(map(str, a)) == b
+    if isinstance(b, list) and isinstance(a, str):
+        return loose_equals(b, a)
+    return False
+
+
+def get_var(data, name, default=None):
+    if name in ('', None):
+        return data
+    current = data
+    for part in str(name).split('.'):
+        if isinstance(current, dict) and part in current:
+            current = current[part]
+        elif isinstance(current, list) and part.isdigit() and int(part) < len(current):
+            current = current[int(part)]
+        else:
+            return default
+    return current
+
+
+def apply_logic(logic, data):
+    """Evaluate a JsonLogic expression against data (raises ValueError/TypeError like the plugin's 400s)"""
+    if isinstance(logic, list):
+        return [apply_logic(item, data) for item in logic]
+    if not isinstance(logic, dict) or len(logic) != 1:
+        return logic
+    op, args = next(iter(logic.items()))
+    if not isinstance(args, list):
+        args = [args]
+
+    if op == 'var':
+        default = apply_logic(args[1], data) if len(args) > 1 else None
+        return get_var(data, apply_logic(args[0], data), default)
+    if op == 'if':
+        for i in range(0, len(args) - 1, 2):
+            if truthy(apply_logic(args[i], data)):
+                return apply_logic(args[i + 1], data)
+        return apply_logic(args[-1], data) if len(args) % 2 else None
+    if op in ('and', 'or'):
+        value = op == 'and'
+        for arg in args:
+            value = apply_logic(arg, data)
+            if truthy(value) != (op == 'and'):
+                return value
+        return value
+    if op in ('some', 'all', 'none', 'map', 'filter'):
+        sequence = apply_logic(args[0], data)
+        if sequence is None:
+            raise TypeError("Cannot read properties of null (reading 'length')")
+        if not isinstance(sequence, (list, str)):
+            sequence = []
+        if op == 'some':
+            return any(truthy(apply_logic(args[1], item)) for item in sequence)
+        if op == 'all':
+            return bool(sequence) and all(truthy(apply_logic(args[1], item)) for item in sequence)
+        if op == 'none':
+            return not any(truthy(apply_logic(args[1], item)) for item in sequence)
+        if op == 'map':
+            return [apply_logic(args[1], item) for item in sequence]
+        return [item for item in sequence if truthy(apply_logic(args[1], item))]
+
+    values = [apply_logic(arg, data) for arg in args]
+    if op == '==':
+        return loose_equals(values[0], values[1])
+    if op == '!=':
+        return not loose_equals(values[0], values[1])
+    if op == '===':
+        return values[0] == values[1] and type(values[0]) == type(values[1])
+    if op == '!==':
+        return not (values[0] == values[1] and type(values[0]) == type(values[1]))
+    if op == '!!':
+        return truthy(values[0])
+    if op == '!':
+        return not truthy(values[0])
+    if op == 'in':
+        if isinstance(values[1], (list, str)):
+            try:
+                return values[0] in values[1]
+            except TypeError:
+                return False
+        return False
+    if op == 'substr':
+        text, start = str(values[0]), values[1]
+        if len(values) > 2:
+            length = values[2]
+            return text[start:start + length] if length >= 0 else text[start:length]
+        return text[start:]
+    if op == 'cat':
+        return ''.join(str(value) for value in values)
+    if op == 'regexp':
+        return re.search(values[0], str(values[1])) is not None
+    if op == 'glob':
+        return fnmatch.fnmatchcase(str(values[1]), values[0])
+    if op in ('<', '>', '<=', '>='):
+        a, b = values[0], values[1]
+        return {'<': a < b, '>': a > b, '<=': a <= b, '>=': a >= b}[op]
+    if op == 'missing':
+        return [key for key in values if get_var(data, key) is None]
+    raise ValueError(f"Unrecognized operation {op}")
+
+
+class Vault:
+    """The served folder, with parsed notes cached by (size, mtime) so the server stays cheap"""
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        self.lock = threading.Lock()
+        self.notes: Dict[str, Tuple[Tuple[int, int], Dict]] = {}
+
+    def full_path(self, relative_path: str) -> str:
+        path = os.path.normpath(os.path.join(self.root, relative_path))
+        if path != self.root and not path.startswith(self.root + os.sep):
+            raise ValueError(f"{relative_path} is outside the vault")
+        return path
+
+    def markdown_files(self) -> List[str]:
+        files = []
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith('.'))
+            for filename in sorted(filenames):
+                if filename.endswith('.md'):
+                    files.append(os.path.relpath(os.path.join(dirpath, filename), self.root))
+        return files
+
+    def note(self, relative_path: str) -> Optional[Dict]:
+        """The note+json representation of a note (None if it doesn't exist)"""
+        path = self.full_path(relative_path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        version = (stat.st_size, stat.st_mtime_ns)
+        with self.lock:
+            cached = self.notes.get(relative_path)
+        if cached and cached[0] == version:
+            return cached[1]
+
+        # As Obsidian does, serve the content as it is on disk (CRLF included)
+        with open(path, encoding='utf-8', newline='') as f:
+            content = f.read()
+        frontmatter = {}
+        if content.startswith(('---\n', '---\r\n')):
+            end = content.find('\n---', 3)
+            if end > 0:
+                try:
+                    frontmatter = yaml.safe_load(content[4:end]) or {}
+                except yaml.YAMLError:
+                    frontmatter = {}
+                if not isinstance(frontmatter, dict):
+                    frontmatter = {}
+        tags = [str(tag) for tag in frontmatter.get('tags') or []] if isinstance(frontmatter.get('tags'), list) else []
+        tags += INLINE_TAG.findall(content)
+        note = {
+            'content': content,
+            'frontmatter': json.loads(json.dumps(frontmatter, default=str)),
+            'path': relative_path,
+            'stat': {'ctime': int(stat.st_ctime * 1000), 'mtime': int(stat.st_mtime * 1000), 'size': stat.st_size},
+            'tags': tags
+        }
+        with self.lock:
+            self.notes[relative_path] = (version, note)
+        return note
+
+    def linking_notes(self, target: str) -> List[str]:
+        """Notes with a wikilink to target, like Dataview's LIST FROM [[target]]"""
+        name = re.escape(target.split('/')[-1])
+        link = re.compile(r'\[\[([^\]|#]*/)?' + name + r'(\.md)?[\]|#]')
+        return [path for path in self.markdown_files() if link.search(self.note(path)['content'])]
+
+
+class RequestStats:
+    """Requests and bytes per endpoint ("GET /vault/", "POST /search/", ...)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.requests: Dict[str, int] = {}
+            self.bytes_in = 0
+            self.bytes_out = 0
+
+    def record(self, endpoint: str, bytes_in: int, bytes_out: int):
+        with self.lock:
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+
+    def snapshot(self) -> Dict:
+        with self.lock:
+            return {
+                'requests': sum(self.requests.values()),
+                'by_endpoint': dict(sorted(self.requests.items())),
+                'bytes_in': self.bytes_in,
+                'bytes_out': self.bytes_out
+            }
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server: 'FakeObsidianHTTPServer'
+
+    def log_message(self, format, *args):
+        pass
+
+    def endpoint(self) -> str:
+        path = urlparse(self.path).path
+        for prefix in ('/search/simple/', '/search/', '/vault/'):
+            if path.startswith(prefix):
+                return f"{self.command} {prefix}"
+        return f"{self.command} {path}"
+
+    def read_body(self) -> bytes:
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        self.bytes_in = len(body)
+        return body
+
+    def respond(self, status: int, body=b'', content_type: str = 'application/json'):
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode('utf-8')
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.stats.record(self.endpoint(), self.bytes_in, len(body))
+
+    def dispatch(self, handler):
+        self.bytes_in = 0
+        if self.headers.get('Authorization') != f"Bearer {self.server.api_key}":
+            self.read_body()
+            return self.respond(401, {'message': 'Authorization required', 'errorCode': 40101})
+        try:
+            handler()
+        except ValueError as e:
+            self.respond(400, {'message': str(e), 'errorCode': 40000})
+
+    def vault_path(self) -> str:
+        return unquote(urlparse(self.path).path)[len('/vault/'):]
+
+    def do_GET(self):
+        self.dispatch(self.get)
+
+    def do_PUT(self):
+        self.dispatch(self.put)
+
+    def do_DELETE(self):
+        self.dispatch(self.delete)
+
+    def do_POST(self):
+        self.dispatch(self.post)
+
+    def do_PATCH(self):
+        self.dispatch(self.patch)
+
+    def get(self):
+        vault = self.server.vault
+        if not urlparse(self.path).path.startswith('/vault/'):
+            return self.respond(404, {'message': 'Not Found', 'errorCode': 40400})
+        relative_path = self.vault_path()
+        full_path = vault.full_path(relative_path)
+
+        if relative_path == '' or relative_path.endswith('/'):
+            if not os.path.isdir(full_path):
+                return self.respond(404, {'message': 'Not Found', 'errorCode': 40400})
+            files = [name + '/' if os.path.isdir(os.path.join(full_path, name)) else name
+                     for name in sorted(os.listdir(full_path)) if not name.startswith('.')]
+            return self.respond(200, {'files': files})
+
+        if not os.path.isfile(full_path):
+            return self.respond(404, {'message': 'Not Found', 'errorCode': 40400})
+        if NOTE_JSON in (self.headers.get('Accept') or ''):
+            return self.respond(200, vault.note(relative_path), NOTE_JSON)
+        with open(full_path, 'rb') as f:
+            return self.respond(200, f.read(), 'text/markdown')
+
+    def put(self):
+        full_path = self.server.vault.full_path(self.vault_path())
+        body = self.read_body()
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, 'wb') as f:
+            f.write(body)
+        self.respond(204)
+
+    def patch(self):
+        full_path = self.server.vault.full_path(self.vault_path())
+        body = self.read_body()
+        if not os.path.isfile(full_path):
+            return self.respond(404, {'message': 'Not Found', 'errorCode': 40400})
+        if self.headers.get('Operation') != 'replace' or self.headers.get('Target-Type') != 'heading':
+            raise ValueError("Only heading replace patches are supported")
+        with open(full_path, 'r', encoding='utf-8', newline='') as f:
+            content = f.read()
+        span = heading_section(content, unquote(self.headers.get('Target') or ''))
+        if span is None:
+            return self.respond(400, {'message': 'Target not found', 'errorCode': 40080})
+        with open(full_path, 'w', encoding='utf-8', newline='') as f:
+            f.write(content[:span[0]] + body.decode('utf-8') + content[span[1]:])
+        self.respond(200, b'', 'text/markdown')
+
+    def delete(self):
+        full_path = self.server.vault.full_path(self.vault_path())
+        if not os.path.isfile(full_path):
+            return self.respond(404, {'message': 'Not Found', 'errorCode': 40400})
+        os.remove(full_path)
+        self.respond(204)
+
+    def post(self):
+        vault = self.server.vault
+        url = urlparse(self.path)
+        body = self.read_body()
+
+        if url.path == '/search/' and 'jsonlogic' in (self.headers.get('Content-Type') or ''):
+            logic = json.loads(body)
+            results = []
+            try:
+                for path in vault.markdown_files():
+                    result = apply_logic(logic, vault.note(path))
+                    if truthy(result):
+                        results.append({'filename': path, 'result': result})
+            except TypeError as e:
+                raise ValueError(str(e))
+            return self.respond(200, results)
+
+        if url.path == '/search/':
+            match = DATAVIEW_FROM.search(body.decode('utf-8'))
+            if not match:
+                raise ValueError("Only LIST FROM [[note]] Dataview queries are supported")
+            return self.respond(200, [{'filename': path, 'result': {}} for path in vault.linking_notes(match.group(1))])
+
+        if url.path == '/search/simple/':
+            query = parse_qs(url.query).get('query', [''])[0].strip('"').lower()
+            results = []
+            for path in vault.markdown_files():
+                note = vault.note(path)
+                if query.startswith('tag:'):
+                    tags = {tag.lower() for tag in note['tags']}
+                    found = all(term[4:].lstrip('#') in tags for term in query.split())
+                else:
+                    found = query in note['content'].lower()
+                if found:
+                    results.append({'filename': path, 'score': 1, 'matches': []})
+            return self.respond(200, results)
+
+        self.respond(404, {'message': 'Not Found', 'errorCode': 40400})
+
+
+class FakeObsidianHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+class FakeObsidianServer:
+    """
+    Runs the fake API on a background thread.
+
+    Args:
+        root: Vault folder to serve
+        port: Port to listen on (0 picks a free one)
+        latency: Seconds added to every response
+        api_key: Bearer token clients must send
+    """
+
+    def __init__(self, root: str, port: int = 0, latency: float = 0.0, api_key: str = API_KEY):
+        self.httpd = FakeObsidianHTTPServer(('127.0.0.1', port), RequestHandler)
+        self.httpd.vault = Vault(root)
+        self.httpd.stats = RequestStats()
+        self.httpd.latency = latency
+        self.httpd.api_key = api_key
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    @property
+    def stats(self) -> RequestStats:
+        return self.httpd.stats
+
+    def start(self) -> 'FakeObsidianServer':
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a vault folder through a fake Obsidian Local REST API.")
+    parser.add_argument('root', help='Vault folder to serve')
+    parser.add_argument('--port', type=int, default=27124, help='Port to listen on (default: 27124)')
+    parser.add_argument('--latency-ms', type=float, default=0, help='Delay added to every response (default: 0)')
+    parser.add_argument('--api-key', default=API_KEY, help=f'Bearer token to accept (default: {API_KEY})')
+    args = parser.parse_args()
+
+    server = FakeObsidianServer(args.root, args.port, args.latency_ms / 1000, args.api_key).start()
+    print(f"Serving {os.path.abspath(args.root)} at {server.url} (API key: {args.api_key}); Ctrl-C to stop")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        print(json.dumps(server.stats.snapshot(), indent=2))
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
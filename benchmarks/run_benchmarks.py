@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark suite for the utilities.
+Generates a synthetic vault, serves it through the fake Obsidian REST API
+and runs mdquery, mdget, obsidian_query, obsidian_mv and the mv wrapper against it as real
+subprocesses (from a sandboxed copy of the scripts with their own
+settings.json, .env and cache folder, so your configuration and caches are
+never touched). For every scenario it reports wall time, peak RSS, and the
+requests and bytes that went over the API.
+
+Baselines are saved under benchmarks/baselines/ and later runs can be
+compared against them; --compare exits with status 1 on a regression.
+
+Usage:
+    python3 benchmarks/run_benchmarks.py
+    python3 benchmarks/run_benchmarks.py --notes 10000 --latency-ms 2 --save-baseline main
+    python3 benchmarks/run_benchmarks.py --notes 10000 --latency-ms 2 --compare main
+    python3 benchmarks/run_benchmarks.py --only 'obsidian_query/*' --repeat 5
+"""
+
+import argparse
+import compileall
+import datetime
+import fnmatch
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from fake_obsidian_server import API_KEY, FakeObsidianServer
+from vault_generator import add_spec_arguments, generate_vault, spec_from_args
+
+repo_dir = Path(__file__).resolve().parent.parent
+BASELINE_DIR = Path(__file__).resolve().parent / "baselines"
+
+# Wall-time changes smaller than this are noise, whatever the percentage
+MIN_WALL_DELTA = 0.02
+# ru_maxrss is in kilobytes on Linux and bytes on macOS
+RSS_UNIT = 1 if sys.platform == 'darwin' else 1024
+
+
+class Scenario:
+    """
+    One benchmarked command.
+
+    Attributes:
+        tool: Script in executable_scripts
+        name: Scenario name, unique per tool
+        argv: Arguments (may use {vault}, {sandbox}, {popular} and {popular_name})
+        prepare: Called before every timed run (e.g. to drop caches)
+        warm: Run once untimed first, so caches are populated
+        direct: Execute the script itself, so its shebang (interpreter and flags) is part of what's timed
+        closed_stdout: Write into a pipe whose reader has already gone (as with `| head`); the run must
+            still exit 0
+    """
+
+    def __init__(self, tool: str, name: str, argv: List[str], prepare: Optional[Callable] = None,
+                 warm: bool = False, direct: bool = False, closed_stdout: bool = False):
+        self.tool = tool
+        self.name = name
+        self.argv = argv
+        self.prepare = prepare
+        self.warm = warm
+        self.direct = direct
+        self.closed_stdout = closed_stdout
+
+    @property
+    def key(self) -> str:
+        return f"{self.tool}/{self.name}"
+
+
+class Sandbox:
+    """A private copy of the scripts wired to the fake server, plus a pristine copy of the vault"""
+
+    def __init__(self, workdir: Path, vault: Path, server: FakeObsidianServer, local_vault: bool):
+        self.workdir = workdir
+        self.vault = vault
+        self.pristine = workdir / "pristine"
+        self.tools = workdir / "tools"
+        self.cache_dir = workdir / "cache"
+        self.server = server
+
+        shutil.copytree(vault, self.pristine)
+        ignore = shutil.ignore_patterns('__pycache__', '*.pyc', '.mdquery-cache.sqlite')
+        for folder in ('executable_scripts', 'utilities_data'):
+            shutil.copytree(repo_dir / folder, self.tools / folder, ignore=ignore)
+        (self.tools / ".env").write_text(f'LOCAL_OBSIDIAN_KEY="{API_KEY}"\n')
+
+        settings_file = self.tools / "utilities_data" / "obsidian_mv" / "settings.json"
+        settings = json.loads(settings_file.read_text())
+        settings.update({
+            'api_base_url': server.url,
+            'vault_root': str(vault),
+            'local_vault_access': local_vault,
+            'cache_dir': str(self.cache_dir)
+        })
+        settings_file.write_text(json.dumps(settings, indent=2))
+        # Compile up front so the first timed run doesn't pay for it
+        compileall.compile_dir(str(self.tools / "utilities_data"), quiet=1)
+
+    def script(self, tool: str) -> Path:
+        return self.tools / "executable_scripts" / tool
+
+    def clear_caches(self):
+        """Drop every persistent cache: mdquery's frontmatter caches and cache_dir"""
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        for cache_file in self.vault.rglob('.mdquery-cache.sqlite*'):
+            cache_file.unlink()
+
+    def restore_vault(self):
+        """Put the vault back the way it was generated (after a real rename)"""
+        shutil.rmtree(self.vault)
+        shutil.copytree(self.pristine, self.vault)
+
+
+def scenarios(sandbox: Sandbox, notes: List[str]) -> List[Scenario]:
+    batch = [str(sandbox.vault / path) for path in notes[:200]]
+    export_file = sandbox.workdir / "export.sqlite"
+    scratch_file = sandbox.workdir / "scratch.txt"
+
+    def fresh_export():
+        if export_file.exists():
+            export_file.unlink()
+
+    def renamed_vault():
+        sandbox.restore_vault()
+        sandbox.clear_caches()
+
+    def fresh_scratch():
+        scratch_file.write_text('scratch\n')
+
+    return [
+        Scenario('mdquery', 'count-cold', ['-d', '{vault}', '--count', '--no-cache']),
+        Scenario('mdquery', 'property', ['-d', '{vault}', '--property', 'source=youtube', '--count'], warm=True),
+        Scenario('mdquery', 'tag-json', ['-d', '{vault}', '--tag', 'python', '--output', 'json'], warm=True),
+        Scenario('mdquery', 'search', ['-d', '{vault}', '--search', 'grizzly', '--count'], warm=True),
+        Scenario('mdquery', 'stats', ['-d', '{vault}', '--stats'], warm=True),
+        Scenario('mdquery', 'export', ['-d', '{vault}', '--export', str(export_file)], prepare=fresh_export,
+                 warm=True),
+        Scenario('mdget', 'batch-200', batch + ['--all', '--output', 'json']),
+        Scenario('mdget', 'text-closed-stdout', batch + ['--all'], closed_stdout=True),
+        Scenario('mdget', 'ndjson-closed-stdout', batch + ['--all', '--output', 'ndjson'], closed_stdout=True),
+        Scenario('obsidian_query', 'stats', ['--stats'], prepare=sandbox.clear_caches),
+        Scenario('obsidian_query', 'property', ['--property', 'source=youtube', '--count']),
+        Scenario('obsidian_query', 'tag', ['--tag', 'python', '--output', 'json']),
+        Scenario('obsidian_query', 'search', ['--search', 'grizzly', '--count']),
+        Scenario('obsidian_query', 'backlinks-cold', ['--backlinks', '{popular_name}'], prepare=sandbox.clear_caches),
+        Scenario('obsidian_query', 'backlinks-warm', ['--backlinks', '{popular_name}'], warm=True),
+        Scenario('obsidian_mv', 'rename-dry-run', ['--dry-run', '{popular}', '{vault}/Renamed Note.md'],
+                 warm=True),
+        Scenario('obsidian_mv', 'rename', ['{popular}', '{vault}/Renamed Note.md'], prepare=renamed_vault),
+        # The mv wrapper: startup when it just hands off to /bin/mv, and when it runs obsidian_mv
+        Scenario('mv', 'plain-file', [str(scratch_file), str(sandbox.workdir / "moved.txt")], prepare=fresh_scratch,
+                 direct=True),
+        Scenario('mv', 'note-dry-run', ['--dry-run', '{popular}', '{vault}/Renamed Note.md'], warm=True,
+                 direct=True),
+    ]
+
+
+def run_once(command: List[str], cwd: Path, env: Dict[str, str], closed_stdout: bool = False) -> Dict:
+    """Run command to completion; returns its wall time, peak RSS and exit status"""
+    started = time.perf_counter()
+    process = subprocess.Popen(command, cwd=cwd, env=env, stderr=subprocess.PIPE,
+                               stdout=subprocess.PIPE if closed_stdout else subprocess.DEVNULL)
+    if closed_stdout:
+        process.stdout.close()
+    stderr = process.stderr.read()
+    _, status, usage = os.wait4(process.pid, 0)
+    wall = time.perf_counter() - started
+    process.returncode = os.waitstatus_to_exitcode(status)
+    return {
+        'wall': wall,
+        'rss': usage.ru_maxrss * RSS_UNIT,
+        'returncode': process.returncode,
+        'stderr': stderr.decode('utf-8', 'replace').strip()
+    }
+
+
+def run_scenario(scenario: Scenario, sandbox: Sandbox, substitutions: Dict[str, str], repeat: int,
+                 env: Dict[str, str]) -> Dict:
+    argv = [arg.format(**substitutions) for arg in scenario.argv]
+    script = str(sandbox.script(scenario.tool))
+    command = ([script] if scenario.direct else [sys.executable, script]) + argv
+    if scenario.warm:
+        if scenario.prepare:
+            scenario.prepare()
+        run_once(command, sandbox.vault, env, scenario.closed_stdout)
+
+    runs = []
+    for _ in range(repeat):
+        if scenario.prepare:
+            scenario.prepare()
+        sandbox.server.stats.reset()
+        run = run_once(command, sandbox.vault, env, scenario.closed_stdout)
+        run.update(sandbox.server.stats.snapshot())
+        if run['returncode'] != 0:
+            raise RuntimeError(f"{scenario.key} exited with status {run['returncode']}:\n{run['stderr']}")
+        runs.append(run)
+
+    return {
+        'wall': statistics.median(run['wall'] for run in runs),
+        'wall_min': min(run['wall'] for run in runs),
+        'rss': max(run['rss'] for run in runs),
+        'requests': runs[-1]['requests'],
+        'by_endpoint': runs[-1]['by_endpoint'],
+        'bytes_in': runs[-1]['bytes_in'],
+        'bytes_out': runs[-1]['bytes_out']
+    }
+
+
+def compare(results: Dict[str, Dict], baseline: Dict, threshold: float) -> List[str]:
+    """Regressions against a baseline, as printable lines"""
+    regressions = []
+    for key, result in results.items():
+        old = baseline['results'].get(key)
+        if old is None:
+            continue
+        if result['wall'] > old['wall'] * (1 + threshold) and result['wall'] - old['wall'] > MIN_WALL_DELTA:
+            regressions.append(f"{key}: wall time {old['wall']:.3f}s -> {result['wall']:.3f}s")
+        if result['rss'] > old['rss'] * (1 + threshold):
+            regressions.append(f"{key}: peak RSS {old['rss'] / 1e6:.1f}MB -> {result['rss'] / 1e6:.1f}MB")
+        # Request counts are deterministic, so any increase is real
+        if result['requests'] > old['requests']:
+            regressions.append(f"{key}: requests {old['requests']} -> {result['requests']}")
+        if result['bytes_out'] > old['bytes_out'] * (1 + threshold):
+            regressions.append(f"{key}: bytes received {old['bytes_out']} -> {result['bytes_out']}")
+    return regressions
+
+
+def change(new: float, old: Optional[float]) -> str:
+    if not old:
+        return ''
+    return f" ({(new - old) / old:+.0%})"
+
+
+def print_report(results: Dict[str, Dict], baseline: Optional[Dict]):
+    old_results = baseline['results'] if baseline else {}
+    print(f"{'Scenario':<32} {'Wall (s)':>16} {'Peak RSS (MB)':>18} {'Requests':>16} {'KB received':>18} {'KB sent':>10}")
+    print('-' * 115)
+    for key, result in results.items():
+        old = old_results.get(key, {})
+        wall = f"{result['wall']:.3f}{change(result['wall'], old.get('wall'))}"
+        rss = f"{result['rss'] / 1e6:.1f}{change(result['rss'], old.get('rss'))}"
+        requests = f"{result['requests']}{change(result['requests'], old.get('requests'))}"
+        received = f"{result['bytes_out'] / 1024:.0f}{change(result['bytes_out'], old.get('bytes_out'))}"
+        print(f"{key:<32} {wall:>16} {rss:>18} {requests:>16} {received:>18} {result['bytes_in'] / 1024:>10.0f}")
+
+
+def create_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the utilities end to end against a synthetic vault and a fake Obsidian REST API.")
+    add_spec_arguments(parser)
+
+    run = parser.add_argument_group('⏱️  Run Options')
+    run.add_argument('--latency-ms', type=float, default=0,
+                     help='Delay the fake API adds to every response (default: 0)')
+    run.add_argument('--local-vault', action='store_true',
+                     help='Let the tools read the vault from disk (local_vault_access) instead of only via the API')
+    run.add_argument('--repeat', type=int, default=3, help='Timed runs per scenario; the median is reported (default: 3)')
+    run.add_argument('--only', metavar='PATTERN', action='append',
+                     help="Run only matching scenarios, e.g. 'mdquery/*' (repeatable)")
+    run.add_argument('--list', action='store_true', help='List scenarios and exit')
+    run.add_argument('--keep', action='store_true', help='Keep the generated vault and sandbox and print where')
+
+    baselines = parser.add_argument_group('📊 Baselines')
+    baselines.add_argument('--save-baseline', metavar='NAME', help=f'Save results to {BASELINE_DIR.name}/NAME.json')
+    baselines.add_argument('--compare', metavar='NAME', help='Compare with a saved baseline; exit 1 on regressions')
+    baselines.add_argument('--threshold', type=float, default=0.15,
+                           help='Relative slowdown/growth counted as a regression (default: 0.15)')
+    baselines.add_argument('--json', action='store_true', help='Print results as JSON instead of a table')
+    return parser
+
+
+def main():
+    args = create_parser().parse_args()
+    spec = spec_from_args(args)
+
+    baseline = None
+    if args.compare:
+        baseline_file = BASELINE_DIR / f"{args.compare}.json"
+        if not baseline_file.exists():
+            print(f"Error: no baseline named {args.compare} ({baseline_file})", file=sys.stderr)
+            sys.exit(2)
+        baseline = json.loads(baseline_file.read_text())
+        if baseline['spec'] != spec.as_dict() or baseline['latency_ms'] != args.latency_ms:
+            print(f"Warning: baseline {args.compare} was recorded with a different vault or latency", file=sys.stderr)
+
+    workdir = Path(tempfile.mkdtemp(prefix='obsidian-bench-'))
+    vault = workdir / "vault"
+    try:
+        started = time.perf_counter()
+        notes = generate_vault(str(vault), spec)
+        print(f"Generated {len(notes)} notes in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+        with FakeObsidianServer(str(vault), latency=args.latency_ms / 1000) as server:
+            sandbox = Sandbox(workdir, vault, server, args.local_vault)
+            popular = str(vault / notes[0])
+            substitutions = {'vault': str(vault), 'sandbox': str(sandbox.tools), 'popular': popular,
+                             'popular_name': Path(popular).stem}
+            env = dict(os.environ, OBSIDIAN_UTILITIES_NO_DAEMON='1')
+
+            selected = [s for s in scenarios(sandbox, notes)
+                        if not args.only or any(fnmatch.fnmatch(s.key, pattern) for pattern in args.only)]
+            if args.list:
+                for scenario in selected:
+                    print(f"{scenario.key:<32} {scenario.tool} {' '.join(scenario.argv)}")
+                return
+
+            results = {}
+            for scenario in selected:
+                print(f"Running {scenario.key}...", file=sys.stderr)
+                results[scenario.key] = run_scenario(scenario, sandbox, substitutions, args.repeat, env)
+                if scenario.tool == 'obsidian_mv':
+                    sandbox.restore_vault()
+    except RuntimeError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(2)
+    finally:
+        if args.keep:
+            print(f"Kept {workdir}", file=sys.stderr)
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_report(results, baseline)
+
+    if args.save_baseline:
+        BASELINE_DIR.mkdir(exist_ok=True)
+        baseline_file = BASELINE_DIR / f"{args.save_baseline}.json"
+        baseline_file.write_text(json.dumps({
+            'created': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'spec': spec.as_dict(),
+            'latency_ms': args.latency_ms,
+            'local_vault': args.local_vault,
+            'repeat': args.repeat,
+            'results': results
+        }, indent=2) + '\n')
+        print(f"\nSaved baseline {baseline_file}")
+
+    if baseline:
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) against {args.compare}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nNo regressions against {args.compare} (threshold {args.threshold:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Synthetic Obsidian vault generator for the benchmarks.
+Writes a deterministic vault of markdown notes with YAML frontmatter,
+nested folders, wikilinks in the forms Obsidian users write them (plain,
+aliased, with headings/blocks, embeds, by path) and inline #tags. Link
+targets follow a power law, so a few notes are linked from everywhere
+(the expensive case for renames) and most are linked rarely.
+
+Usage:
+    python3 benchmarks/vault_generator.py /tmp/vault --notes 10000
+    python3 benchmarks/vault_generator.py /tmp/vault --notes 2000 --depth 3 --links 20 --body-bytes 8000
+"""
+
+import argparse
+import datetime
+import os
+import random
+import shutil
+from pathlib import Path
+from typing import Dict, List
+
+SOURCES = ['youtube', 'podcast', 'article', 'book', 'paper']
+STATUSES = ['inbox', 'reading', 'done', 'archived']
+TAGS = ['ai', 'python', 'wildlife', 'history', 'music', 'science', 'travel', 'cooking', 'finance', 'health',
+        'project', 'project/alpha', 'project/beta', 'idea', 'reference']
+WORDS = ('grizzly bear salmon river machine learning neural network python programming ancient rome '
+         'empire jazz piano recipe bread market risk sleep study the of and to in is for with on '
+         'that this from by at as be are was it an or not but which').split()
+LINK_FORMS = ['[[{name}]]', '[[{name}|{alias}]]', '[[{path}]]', '[[{name}#Heading]]', '![[{name}]]',
+              '[[{name}#^block1]]', '[[{path}.md|{alias}]]']
+# Body text between '## Part N' subheadings
+SECTION_BYTES = 600
+
+
+class VaultSpec:
+    """
+    Shape of a generated vault.
+
+    Attributes:
+        notes: Number of notes
+        depth: Folder nesting depth (0 puts every note in the vault root)
+        fanout: Subfolders per folder
+        properties: Extra prop_N properties per note, on top of the standard ones
+        list_properties: How many of the extra properties hold lists
+        tags: Tags per note (ai_tags and tags)
+        links: Average wikilinks per note
+        body_bytes: Approximate body size per note
+        seed: Random seed (the same spec always produces the same vault)
+    """
+
+    def __init__(self, notes: int = 2000, depth: int = 2, fanout: int = 4, properties: int = 5,
+                 list_properties: int = 1, tags: int = 3, links: float = 5.0, body_bytes: int = 2000,
+                 seed: int = 0):
+        self.notes = notes
+        self.depth = depth
+        self.fanout = fanout
+        self.properties = properties
+        self.list_properties = list_properties
+        self.tags = tags
+        self.links = links
+        self.body_bytes = body_bytes
+        self.seed = seed
+
+    def as_dict(self) -> Dict:
+        return dict(vars(self))
+
+
+def folders(spec: VaultSpec) -> List[str]:
+    """Leaf folders notes are spread over ('' for the vault root)"""
+    level = ['']
+    for depth in range(spec.depth):
+        level = [os.path.join(parent, f"area {depth}-{i}") for parent in level for i in range(spec.fanout)]
+    return level
+
+
+def note_paths(spec: VaultSpec) -> List[str]:
+    """Vault-relative path of every note, in creation order"""
+    leaves = folders(spec)
+    width = len(str(spec.notes))
+    return [os.path.join(leaves[i % len(leaves)], f"Note {i:0{width}d}.md") for i in range(spec.notes)]
+
+
+def popular_index(rng: random.Random, notes: int) -> int:
+    """A note index drawn from a power law: note 0 is the most linked"""
+    return min(notes - 1, int(rng.paretovariate(1.2)) - 1)
+
+
+def frontmatter(spec: VaultSpec, rng: random.Random, index: int) -> str:
+    created = datetime.date(2020, 1, 1) + datetime.timedelta(days=rng.randrange(1500))
+    lines = [
+        '---',
+        f'title: "{" ".join(rng.choice(WORDS) for _ in range(4)).title()}"',
+        f'source: {rng.choice(SOURCES)}',
+        f'status: {rng.choice(STATUSES)}',
+        f'rating: {rng.randint(1, 5)}',
+        f'created: {created.isoformat()}',
+        f'ai_tags: [{", ".join(rng.sample(TAGS[:10], min(spec.tags, 10)))}]',
+        'tags:',
+    ]
+    lines += [f'  - {tag}' for tag in rng.sample(TAGS, min(spec.tags, len(TAGS)))]
+    for prop in range(spec.properties):
+        if prop < spec.list_properties:
+            lines.append(f'prop_{prop}: [{", ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 4)))}]')
+        elif prop % 2:
+            lines.append(f'prop_{prop}: {rng.randint(0, 1000)}')
+        else:
+            lines.append(f'prop_{prop}: {" ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 6)))}')
+    lines.append(f'summary: {" ".join(rng.choice(WORDS) for _ in range(25))}')
+    lines.append('---')
+    return '\n'.join(lines) + '\n'
+
+
+def body(spec: VaultSpec, rng: random.Random, paths: List[str]) -> str:
+    link_count = int(rng.expovariate(1 / spec.links)) if spec.links > 0 else 0
+    links = []
+    for _ in range(link_count):
+        path = paths[popular_index(rng, len(paths))][:-3]
+        links.append(rng.choice(LINK_FORMS).format(name=os.path.basename(path), path=path,
+                                                   alias=rng.choice(WORDS)))
+
+    paragraphs = ['# Heading', '']
+    size = 0
+    parts = 0
+    while size < spec.body_bytes or links:
+        # Subsections, so edits can be sent as PATCHes of one section
+        if size >= parts * SECTION_BYTES:
+            parts += 1
+            if paragraphs[-1]:
+                paragraphs.append('')
+            paragraphs.extend([f'## Part {parts}', ''])
+        sentence = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(8, 20)))
+        if links and rng.random() < 0.7:
+            sentence += ' ' + links.pop()
+        if rng.random() < 0.1:
+            sentence += f" #{rng.choice(TAGS)}"
+        sentence = sentence[0].upper() + sentence[1:] + '.'
+        paragraphs.append(sentence)
+        size += len(sentence) + 1
+        if rng.random() < 0.2:
+            paragraphs.append('')
+    paragraphs.append('Closing line ^block1')
+    return '\n'.join(paragraphs) + '\n'
+
+
+def generate_vault(root: str, spec: VaultSpec, clean: bool = True) -> List[str]:
+    """
+    Write a vault for spec under root.
+
+    Args:
+        root: Vault directory (created if needed)
+        spec: Vault shape
+        clean: Remove whatever is in root first
+
+    Returns:
+        Vault-relative note paths
+    """
+    root = Path(root)
+    if clean and root.exists():
+        shutil.rmtree(root)
+    root.mkdir(parents=True, exist_ok=True)
+    (root / '.obsidian').mkdir(exist_ok=True)
+
+    rng = random.Random(spec.seed)
+    paths = note_paths(spec)
+    for index, path in enumerate(paths):
+        target = root / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(frontmatter(spec, rng, index) + body(spec, rng, paths), encoding='utf-8')
+    return paths
+
+
+def add_spec_arguments(parser: argparse.ArgumentParser):
+    """Vault shape options, shared with run_benchmarks.py"""
+    group = parser.add_argument_group('🏗️  Vault Shape')
+    group.add_argument('--notes', type=int, default=2000, help='Number of notes (default: 2000)')
+    group.add_argument('--depth', type=int, default=2, help='Folder nesting depth (default: 2)')
+    group.add_argument('--fanout', type=int, default=4, help='Subfolders per folder (default: 4)')
+    group.add_argument('--properties', type=int, default=5, help='Extra frontmatter properties per note (default: 5)')
+    group.add_argument('--list-properties', type=int, default=1,
+                       help='How many of the extra properties are lists (default: 1)')
+    group.add_argument('--tags', type=int, default=3, help='Tags per note (default: 3)')
+    group.add_argument('--links', type=float, default=5.0, help='Average wikilinks per note (default: 5)')
+    group.add_argument('--body-bytes', type=int, default=2000, help='Approximate body size per note (default: 2000)')
+    group.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+
+
+def spec_from_args(args) -> VaultSpec:
+    return VaultSpec(args.notes, args.depth, args.fanout, args.properties, args.list_properties, args.tags,
+                     args.links, args.body_bytes, args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic Obsidian vault for benchmarking.")
+    parser.add_argument('root', help='Vault directory to create (its contents are replaced)')
+    add_spec_arguments(parser)
+    args = parser.parse_args()
+
+    paths = generate_vault(args.root, spec_from_args(args))
+    size = sum(os.path.getsize(os.path.join(args.root, path)) for path in paths)
+    print(f"Wrote {len(paths)} notes ({size / 1e6:.1f} MB) to {args.root}")
+
+
+if __name__ == "__main__":
+    main()
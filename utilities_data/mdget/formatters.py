@@ -3,7 +3,7 @@ Output formatters for mdget - handles all result formatting and display
 """
 
 import json
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 
 
 def format_output(data: Dict[str, Any], output_format: str, single_property: Optional[str] = None, raw: bool = False):
@@ -82,4 +82,36 @@ def format_list_value(value):
     """Helper to format list values consistently"""
     if isinstance(value, list):
         return ', '.join(str(v) for v in value)
-    return str(value)
\ No newline at end of file
+    return str(value)
+
+
+def tsv_field(value: Any) -> str:
+    """One TSV cell: strings as they are, lists and dicts as JSON, tabs and newlines escaped"""
+    if value is None:
+        return ''
+    if isinstance(value, (list, dict, bool)):
+        value = json.dumps(value, default=str, ensure_ascii=False)
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+def tsv_header(properties: List[str]) -> str:
+    return '\t'.join(['file'] + [tsv_field(p) for p in properties] + ['error'])
+
+
+def format_row(file_path: str, data: Optional[Dict[str, Any]], error: Optional[str], output_format: str,
+               properties: Optional[List[str]] = None) -> str:
+    """
+    One line for a file in batch output (ndjson or tsv).
+    
+    ndjson: {"file": ..., "properties": {...}, "error": null}; properties is
+    every property with --all, else the requested ones (missing ones null).
+    tsv: file, one column per requested property, error. A file that
+    couldn't be read has its error set and no properties.
+    """
+    if data is not None and properties is not None:
+        data = {prop: data.get(prop) for prop in properties}
+    if output_format == 'tsv':
+        data = data or {}
+        return '\t'.join([tsv_field(file_path)] + [tsv_field(data.get(prop)) for prop in properties]
+                         + [tsv_field(error)])
+    return json.dumps({'file': file_path, 'properties': data, 'error': error}, default=str, ensure_ascii=False)
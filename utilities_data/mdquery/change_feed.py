@@ -0,0 +1,301 @@
+"""
+Change feed for mdquery - what was added, modified, deleted or renamed in a folder since an opaque token
+"""
+
+import base64
+import binascii
+import hashlib
+import json
+import sqlite3
+import uuid
+from functools import partial
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from frontmatter_scan import DEFAULT_MAX_FRONTMATTER_BYTES, map_files, scan_file
+
+CHANGES_FILENAME = '.mdquery-changes.sqlite'
+SCHEMA_VERSION = 1
+
+# Generations of changes kept; a token older than this gets a ChangeFeedError and needs a full listing
+KEEP_GENERATIONS = 1000
+
+HASH_CHUNK = 1024 * 1024
+
+
+class ChangeFeedError(Exception):
+    """Raised for a token that is malformed, expired or belongs to another change log"""
+
+
+def property_hashes(yaml_data: Any) -> Dict[str, str]:
+    """Fingerprint of each top-level property value, so changed keys can be named without storing values"""
+    if not isinstance(yaml_data, dict):
+        return {}
+    return {str(key): hashlib.sha1(json.dumps(value, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:16]
+            for key, value in yaml_data.items()}
+
+
+def fingerprint(file_path: str,
+                max_bytes: int = DEFAULT_MAX_FRONTMATTER_BYTES) -> Tuple[Optional[str], Dict[str, str], Optional[str]]:
+    """
+    Worker entry point: (content hash, property hashes, error) for one file.
+
+    The content hash is None if the file couldn't be read. A front matter
+    error still yields the hash (with no properties), so the file is tracked
+    and the error reported.
+    """
+    digest = hashlib.sha256()
+    try:
+        with open(file_path, 'rb') as f:
+            for block in iter(partial(f.read, HASH_CHUNK), b''):
+                digest.update(block)
+    except OSError as e:
+        return None, {}, str(e)
+    yaml_data, error = scan_file(file_path, max_bytes=max_bytes)
+    return digest.hexdigest(), property_hashes(yaml_data), error
+
+
+def changed_keys(before: Optional[Dict[str, str]], after: Optional[Dict[str, str]]) -> List[str]:
+    """Properties added, removed or given another value between two property fingerprints"""
+    before = before or {}
+    after = after or {}
+    return sorted(key for key in set(before) | set(after) if before.get(key) != after.get(key))
+
+
+class ChangeLog:
+    """
+    SQLite log of the changes seen in a folder, one generation per refresh that found any.
+
+    The files table holds the last known state of every file: size and
+    mtime (ns) to tell which files need looking at, the SHA-256 of the
+    content to pair up renames, and property fingerprints to name the keys
+    that changed. The changes table records each change with the file's state
+    before and after it. A token names a generation, so answering "since
+    this token" only reads the changes made after it.
+    """
+
+    def __init__(self, directory: Path, changes_file: Optional[str] = None):
+        self.directory = Path(directory)
+        self.db_path = Path(changes_file) if changes_file else self.directory / CHANGES_FILENAME
+        # Autocommit mode: refresh() opens its own write transaction
+        self.conn = sqlite3.connect(str(self.db_path), isolation_level=None)
+        self._ensure_schema()
+        self.errors: List[Tuple[str, str]] = []  # (relative_path, error) from the last refresh
+
+    def _ensure_schema(self):
+        """Create tables, starting a new log (with a new id, so old tokens are refused) on a schema change"""
+        version = self.conn.execute('PRAGMA user_version').fetchone()[0]
+        if version != SCHEMA_VERSION:
+            for table in ('files', 'changes', 'meta'):
+                self.conn.execute(f'DROP TABLE IF EXISTS {table}')
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                hash TEXT NOT NULL,
+                props TEXT NOT NULL
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS changes (
+                generation INTEGER NOT NULL,
+                path TEXT NOT NULL,
+                old_path TEXT,
+                before_hash TEXT,
+                after_hash TEXT,
+                before_props TEXT,
+                after_props TEXT
+            )
+        """)
+        self.conn.execute('CREATE INDEX IF NOT EXISTS changes_generation ON changes (generation)')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+        self.conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('id', ?)", (uuid.uuid4().hex[:12],))
+        self.conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('generation', '0')")
+        self.conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('oldest', '0')")
+        self.conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+    def _meta(self, key: str) -> str:
+        return self.conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()[0]
+
+    @property
+    def generation(self) -> int:
+        return int(self._meta('generation'))
+
+    def token(self) -> str:
+        """Opaque token for the current state of the folder"""
+        raw = f"{self._meta('id')}:{self.generation}".encode('ascii')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+    def parse_token(self, token: str) -> int:
+        """The generation a token names, after checking it belongs to this log and is still covered"""
+        try:
+            raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode('ascii')
+            log_id, generation = raw.split(':')
+            generation = int(generation)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise ChangeFeedError(f"'{token}' is not a change token")
+        if log_id != self._meta('id') or generation > self.generation:
+            raise ChangeFeedError(f"Token '{token}' was issued by another change log ({self.db_path} was replaced)")
+        if generation < int(self._meta('oldest')):
+            raise ChangeFeedError(f"Token '{token}' is older than the last {KEEP_GENERATIONS} changes kept")
+        return generation
+
+    def refresh(self, files: Iterable[Tuple[str, str, int, int]], jobs: int = 1,
+                max_bytes: int = DEFAULT_MAX_FRONTMATTER_BYTES) -> int:
+        """
+        Record what changed since the last refresh, returning the number of changes.
+
+        Args:
+            files: (file_path, relative_path, size, mtime_ns) for every file
+                currently in the folder. Only files whose size or mtime differs
+                from the stored state are read; a deleted file and a new one
+                with the same content hash are recorded as a rename.
+            jobs: Worker processes for hashing and parsing the files that changed
+        """
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            known = {path: (size, mtime_ns)
+                     for path, size, mtime_ns in self.conn.execute('SELECT path, size, mtime_ns FROM files')}
+            listed = set()
+            to_read = []
+            for file_path, relative_path, size, mtime_ns in files:
+                listed.add(relative_path)
+                if known.get(relative_path) != (size, mtime_ns):
+                    to_read.append((file_path, relative_path, size, mtime_ns))
+
+            baseline = self.generation == 0 and not known
+            self.errors = []
+            current = {}  # relative_path -> (size, mtime_ns, hash, props)
+            worker = partial(fingerprint, max_bytes=max_bytes)
+            for position, (content_hash, props, error) in map_files(worker, [f[0] for f in to_read], jobs,
+                                                                     ordered=False):
+                _, relative_path, size, mtime_ns = to_read[position]
+                if error is not None:
+                    self.errors.append((relative_path, error))
+                if content_hash is None:
+                    # Unreadable right now: keep the stored state and look again next time
+                    continue
+                current[relative_path] = (size, mtime_ns, content_hash, props)
+
+            previous = {}
+            for relative_path in list(current) + [p for p in known if p not in listed]:
+                row = self.conn.execute('SELECT hash, props FROM files WHERE path = ?', (relative_path,)).fetchone()
+                if row is not None:
+                    previous[relative_path] = (row[0], json.loads(row[1]))
+
+            changes = [] if baseline else self._diff(previous, current, listed)
+            for relative_path, (size, mtime_ns, content_hash, props) in current.items():
+                self.conn.execute('INSERT OR REPLACE INTO files (path, size, mtime_ns, hash, props) '
+                                  'VALUES (?, ?, ?, ?, ?)',
+                                  (relative_path, size, mtime_ns, content_hash, json.dumps(props, sort_keys=True)))
+            gone = [(p,) for p in known if p not in listed]
+            if gone:
+                self.conn.executemany('DELETE FROM files WHERE path = ?', gone)
+
+            if baseline or changes:
+                # The first scan is the baseline everything later is compared with, not a change
+                generation = self.generation + 1
+                self.conn.executemany(
+                    'INSERT INTO changes (generation, path, old_path, before_hash, after_hash, '
+                    'before_props, after_props) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    [(generation,) + change for change in changes]
+                )
+                self.conn.execute("UPDATE meta SET value = ? WHERE key = 'generation'", (str(generation),))
+                oldest = generation - KEEP_GENERATIONS
+                if oldest > int(self._meta('oldest')):
+                    self.conn.execute('DELETE FROM changes WHERE generation <= ?', (oldest,))
+                    self.conn.execute("UPDATE meta SET value = ? WHERE key = 'oldest'", (str(oldest),))
+            self.conn.execute('COMMIT')
+        except BaseException:
+            self.conn.execute('ROLLBACK')
+            raise
+        return len(changes)
+
+    @staticmethod
+    def _diff(previous: Dict[str, Tuple[str, Dict]], current: Dict[str, Tuple], listed: set) -> List[Tuple]:
+        """Change rows (path, old_path, before_hash, after_hash, before_props, after_props) for one refresh"""
+        changes = []
+        deleted = [p for p in previous if p not in listed]
+        added = [p for p in current if p not in previous]
+
+        # Pair each new file with a deleted one holding the same bytes, in path order
+        vanished_by_hash: Dict[str, List[str]] = {}
+        for relative_path in sorted(deleted):
+            vanished_by_hash.setdefault(previous[relative_path][0], []).append(relative_path)
+        renamed_from = {}
+        for relative_path in sorted(added):
+            candidates = vanished_by_hash.get(current[relative_path][2])
+            if candidates:
+                renamed_from[relative_path] = candidates.pop(0)
+        moved = set(renamed_from.values())
+
+        def props_json(props):
+            return None if props is None else json.dumps(props, sort_keys=True)
+
+        for relative_path, (_, _, content_hash, props) in current.items():
+            old_path = renamed_from.get(relative_path)
+            before_hash, before_props = previous.get(old_path or relative_path, (None, None))
+            if old_path is None and before_hash == content_hash:
+                # Touched or rewritten with the same bytes
+                continue
+            changes.append((relative_path, old_path, before_hash, content_hash,
+                            props_json(before_props), props_json(props)))
+        for relative_path in deleted:
+            if relative_path not in moved:
+                before_hash, before_props = previous[relative_path]
+                changes.append((relative_path, None, before_hash, None, props_json(before_props), None))
+        return changes
+
+    def changes_since(self, token: Optional[str]) -> List[Dict[str, Any]]:
+        """
+        The net changes after the token's generation, one entry per file, sorted by path.
+
+        Changes are folded together: a file added and then deleted doesn't
+        appear, a rename followed by an edit is one rename, and a file
+        changed back to its content at the token is left out. Each entry has
+        path, change (added, modified, deleted or renamed), old_path for
+        renames and keys, the properties whose values differ. Without a token
+        every file is listed as added.
+        """
+        if token is None:
+            return [{'path': path, 'change': 'added', 'keys': sorted(json.loads(props))}
+                    for path, props in self.conn.execute('SELECT path, props FROM files ORDER BY path')]
+
+        generation = self.parse_token(token)
+        pending: Dict[str, Dict] = {}  # current path -> {origin, before_hash, before_props, after_hash, after_props}
+        displaced = []  # deletions whose path was reused by a rename
+        rows = self.conn.execute('SELECT path, old_path, before_hash, after_hash, before_props, after_props '
+                                 'FROM changes WHERE generation > ? ORDER BY generation, rowid', (generation,))
+        for path, old_path, before_hash, after_hash, before_props, after_props in rows:
+            source = old_path or path
+            entry = pending.pop(source, None)
+            if entry is None:
+                entry = {'origin': source if before_hash is not None else None,
+                         'before_hash': before_hash, 'before_props': before_props}
+            if old_path is not None and path in pending:
+                # Renamed onto a path whose file was deleted earlier in the window
+                displaced.append(pending.pop(path))
+            entry['after_hash'] = after_hash
+            entry['after_props'] = after_props
+            if after_hash is None and entry['origin'] is None:
+                continue  # added and deleted again
+            pending[path] = entry
+
+        feed = []
+        for path, entry in list(pending.items()) + [(entry['origin'], entry) for entry in displaced]:
+            keys = changed_keys(entry['before_props'] and json.loads(entry['before_props']),
+                                entry['after_props'] and json.loads(entry['after_props']))
+            if entry['origin'] is None:
+                feed.append({'path': path, 'change': 'added', 'keys': keys})
+            elif entry['after_hash'] is None:
+                feed.append({'path': entry['origin'], 'change': 'deleted', 'keys': keys})
+            elif entry['origin'] != path:
+                feed.append({'path': path, 'change': 'renamed', 'old_path': entry['origin'], 'keys': keys})
+            elif entry['before_hash'] != entry['after_hash']:
+                feed.append({'path': path, 'change': 'modified', 'keys': keys})
+        # A deletion sorts before a rename onto the same path, so the feed can be applied in order
+        return sorted(feed, key=lambda change: (change['path'], change['change'] != 'deleted'))
+
+    def close(self):
+        self.conn.close()
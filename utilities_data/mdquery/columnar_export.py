@@ -0,0 +1,435 @@
+"""
+Columnar export for mdquery - typed tables of frontmatter written as Parquet, Arrow IPC or SQLite
+"""
+
+import datetime
+import json
+import os
+import sqlite3
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+# Columns every export starts with; properties are added after them
+FILE_COLUMNS = {
+    'file_path': 'string',
+    'file_size': 'int64',
+    'file_mtime': 'timestamp',
+    'file_mtime_ns': 'int64',
+}
+FORMATS = ('parquet', 'arrow', 'sqlite')
+EXTENSIONS = {
+    '.parquet': 'parquet', '.pq': 'parquet',
+    '.arrow': 'arrow', '.feather': 'arrow', '.ipc': 'arrow',
+    '.sqlite': 'sqlite', '.sqlite3': 'sqlite', '.db': 'sqlite',
+}
+INT64_RANGE = (-2 ** 63, 2 ** 63 - 1)
+
+
+class ExportError(Exception):
+    """Raised when an export can't be written (unknown format, missing pyarrow, unreadable export)"""
+
+
+def export_format(path: str, requested: Optional[str] = None) -> str:
+    """The format to write: the requested one, else the file extension's"""
+    if requested:
+        return requested
+    fmt = EXTENSIONS.get(Path(path).suffix.lower())
+    if fmt is None:
+        raise ExportError(f"Can't tell the export format from '{path}'; "
+                          f"use one of {', '.join(sorted(EXTENSIONS))} or --export-format")
+    return fmt
+
+
+# Types
+#
+# A column type is one of bool, int64, float64, date, timestamp, string, or
+# list<T> for one of the scalar types. YAML values are typed per column: a
+# column whose values disagree is widened (int64 + float64 -> float64,
+# anything else -> string), so no value is lost and no column is mixed.
+
+def value_type(value: Any) -> Optional[str]:
+    """Column type for one YAML value (None for null)"""
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return 'bool'
+    if isinstance(value, int):
+        return 'int64' if INT64_RANGE[0] <= value <= INT64_RANGE[1] else 'string'
+    if isinstance(value, float):
+        return 'float64'
+    if isinstance(value, datetime.datetime):
+        return 'timestamp'
+    if isinstance(value, datetime.date):
+        return 'date'
+    if isinstance(value, list):
+        item_type = None
+        for item in value:
+            item_type = merge_types(item_type, value_type(item))
+        if item_type is None or item_type.startswith('list<'):
+            item_type = 'string'
+        return f'list<{item_type}>'
+    return 'string'
+
+
+def merge_types(a: Optional[str], b: Optional[str]) -> Optional[str]:
+    """The narrowest type that holds values of both types"""
+    if a is None or a == b:
+        return b
+    if b is None:
+        return a
+    if {a, b} == {'int64', 'float64'}:
+        return 'float64'
+    if a.startswith('list<') and b.startswith('list<'):
+        return f'list<{merge_types(a[5:-1], b[5:-1])}>'
+    return 'string'
+
+
+def infer_schema(records: Iterable[Dict[str, Any]], schema: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """
+    Property name -> column type over every record's yaml_data, merged into schema if given.
+
+    Properties that are null everywhere become string columns.
+    """
+    schema = dict(schema or {})
+    for record in records:
+        for key, value in record['yaml_data'].items():
+            key = str(key)
+            schema[key] = merge_types(schema.get(key), value_type(value))
+    return {key: column_type or 'string' for key, column_type in schema.items()}
+
+
+def _to_text(value: Any) -> str:
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, default=str, ensure_ascii=False)
+    return str(value)
+
+
+def convert(value: Any, column_type: str) -> Any:
+    """A YAML value as the Python value stored in a column of column_type"""
+    if value is None:
+        return None
+    if column_type.startswith('list<'):
+        return [convert(item, column_type[5:-1]) for item in value]
+    if column_type == 'float64':
+        return float(value)
+    if column_type == 'timestamp':
+        if value.tzinfo is not None:
+            value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+        return value
+    if column_type == 'string':
+        return _to_text(value)
+    return value
+
+
+def column_names(properties: Iterable[str], names: Optional[Dict[str, str]] = None,
+                 ignore_case: bool = False) -> Dict[str, str]:
+    """
+    Property -> column name, keeping the names already given in names.
+
+    Properties clashing with a file column (or another column) get a trailing
+    underscore. With ignore_case, names that differ only in case clash too
+    (SQLite column names are case-insensitive, so `Tags` and `tags` can't both be columns).
+    """
+    fold = str.casefold if ignore_case else str
+    names = dict(names or {})
+    taken = {fold(name) for name in FILE_COLUMNS} | {fold(name) for name in names.values()}
+    for prop in properties:
+        if prop in names:
+            continue
+        name = str(prop)
+        while fold(name) in taken:
+            name += '_'
+        taken.add(fold(name))
+        names[prop] = name
+    return names
+
+
+class Table:
+    """
+    Columns built from scan results.
+
+    Attributes:
+        schema: Column name -> type, file columns first
+        properties: Property -> column name
+        columns: Column name -> list of values, one per row
+    """
+
+    def __init__(self, records: List[Dict[str, Any]], stats: Callable[[Dict[str, Any]], Tuple[int, int]],
+                 property_types: Dict[str, str], names: Optional[Dict[str, str]] = None,
+                 ignore_case: bool = False):
+        self.properties = column_names(property_types, names, ignore_case)
+        self.schema = dict(FILE_COLUMNS)
+        self.schema.update((self.properties[prop], property_types[prop]) for prop in property_types)
+        self.columns: Dict[str, List[Any]] = {name: [] for name in self.schema}
+
+        for record in records:
+            size, mtime_ns = stats(record)
+            self.columns['file_path'].append(record['relative_path'])
+            self.columns['file_size'].append(size)
+            self.columns['file_mtime'].append(datetime.datetime(1970, 1, 1) +
+                                              datetime.timedelta(microseconds=mtime_ns // 1000))
+            self.columns['file_mtime_ns'].append(mtime_ns)
+            yaml_data = record['yaml_data']
+            if not all(isinstance(key, str) for key in yaml_data):
+                yaml_data = {str(key): value for key, value in yaml_data.items()}
+            for prop, name in self.properties.items():
+                self.columns[name].append(convert(yaml_data.get(prop), self.schema[name]))
+
+    def __len__(self):
+        return len(self.columns['file_path'])
+
+
+# Writers
+#
+# Each writer can write a whole table, and read back and update an existing
+# export, so --append only converts and writes rows for files that changed.
+# Exports record each column's type and source property alongside the data.
+
+class ExportState:
+    """What an existing export holds: column types, column -> property, and file_path -> (size, mtime_ns)"""
+
+    def __init__(self, schema: Dict[str, str], properties: Dict[str, str], files: Dict[str, Tuple[int, int]]):
+        self.schema = schema
+        self.properties = properties
+        self.files = files
+
+
+class SqliteWriter:
+    """
+    A `notes` table with one typed column per property (dependency-free).
+
+    Lists are stored as JSON text, dates and timestamps as ISO 8601 text; the
+    `columns` table records each column's type and property so readers can
+    restore them. pandas (read_sql) and DuckDB (sqlite_scan) read it
+    directly, and --append updates it in place.
+    """
+
+    SQL_TYPES = {'bool': 'INTEGER', 'int64': 'INTEGER', 'float64': 'REAL'}
+    IGNORE_CASE = True
+
+    def __init__(self, path: str):
+        self.path = path
+
+    @staticmethod
+    def _quote(name: str) -> str:
+        return '"' + name.replace('"', '""') + '"'
+
+    def _definition(self, name: str, column_type: str) -> str:
+        return f"{self._quote(name)} {self.SQL_TYPES.get(column_type, 'TEXT')}"
+
+    @staticmethod
+    def _sql_value(value: Any, column_type: str) -> Any:
+        if value is None:
+            return None
+        if column_type.startswith('list<'):
+            return json.dumps(value, default=_to_text, ensure_ascii=False)
+        if column_type in ('date', 'timestamp'):
+            return value.isoformat()
+        return value
+
+    def read_state(self) -> ExportState:
+        conn = sqlite3.connect(self.path)
+        try:
+            rows = conn.execute('SELECT name, type, property FROM columns ORDER BY position').fetchall()
+            files = {path: (size, mtime_ns) for path, size, mtime_ns in
+                     conn.execute('SELECT file_path, file_size, file_mtime_ns FROM notes')}
+        except sqlite3.Error as e:
+            raise ExportError(f"{self.path} is not an mdquery export ({e})")
+        finally:
+            conn.close()
+        return ExportState({name: column_type for name, column_type, _ in rows},
+                           {name: prop for name, _, prop in rows if prop is not None}, files)
+
+    def _write_columns(self, conn: sqlite3.Connection, table: 'Table'):
+        columns = {name: prop for prop, name in table.properties.items()}
+        conn.execute('DELETE FROM columns')
+        conn.executemany('INSERT INTO columns (position, name, type, property) VALUES (?, ?, ?, ?)',
+                         [(position, name, column_type, columns.get(name))
+                          for position, (name, column_type) in enumerate(table.schema.items())])
+
+    def _insert(self, conn: sqlite3.Connection, table: 'Table'):
+        names = list(table.schema)
+        columns = [(table.columns[name], table.schema[name]) for name in names]
+        rows = (tuple(self._sql_value(values[row], column_type) for values, column_type in columns)
+                for row in range(len(table)))
+        conn.executemany(f"INSERT INTO notes ({', '.join(map(self._quote, names))}) "
+                         f"VALUES ({', '.join('?' * len(names))})", rows)
+
+    def write(self, table: 'Table'):
+        tmp_path = f"{self.path}.tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        conn = sqlite3.connect(tmp_path)
+        try:
+            definitions = ', '.join(self._definition(name, column_type) for name, column_type in table.schema.items())
+            conn.execute(f"CREATE TABLE notes ({definitions}, PRIMARY KEY (file_path))")
+            conn.execute('CREATE TABLE columns (position INTEGER, name TEXT, type TEXT, property TEXT)')
+            self._write_columns(conn, table)
+            self._insert(conn, table)
+            conn.commit()
+        finally:
+            conn.close()
+        os.replace(tmp_path, self.path)
+
+    def update(self, state: ExportState, remove: Set[str], table: 'Table'):
+        conn = sqlite3.connect(self.path)
+        try:
+            for name, column_type in table.schema.items():
+                if name not in state.schema:
+                    conn.execute(f"ALTER TABLE notes ADD COLUMN {self._definition(name, column_type)}")
+            conn.executemany('DELETE FROM notes WHERE file_path = ?', [(path,) for path in remove])
+            self._write_columns(conn, table)
+            self._insert(conn, table)
+            conn.commit()
+        finally:
+            conn.close()
+
+
+class ArrowWriter:
+    """
+    Parquet or Arrow IPC (Feather v2) files via pyarrow (zstd-compressed).
+
+    Column types and properties are kept in the schema metadata. These
+    formats can't be modified in place, so --append rewrites the file, but
+    rows for unchanged files are copied column-wise rather than rebuilt.
+    """
+
+    IGNORE_CASE = False
+
+    def __init__(self, path: str, fmt: str):
+        self.path = path
+        self.fmt = fmt
+        try:
+            import pyarrow
+        except ImportError:
+            raise ExportError(f"{fmt} export needs pyarrow (pip install pyarrow); "
+                              f".sqlite export needs nothing extra")
+        self.pa = pyarrow
+        self._existing = None
+
+    def arrow_type(self, column_type: str):
+        pa = self.pa
+        if column_type.startswith('list<'):
+            return pa.list_(self.arrow_type(column_type[5:-1]))
+        return {
+            'bool': pa.bool_(), 'int64': pa.int64(), 'float64': pa.float64(), 'string': pa.string(),
+            'date': pa.date32(), 'timestamp': pa.timestamp('us'),
+        }[column_type]
+
+    def _arrow_schema(self, table: 'Table'):
+        pa = self.pa
+        metadata = {'mdquery_schema': json.dumps(table.schema),
+                    'mdquery_properties': json.dumps({name: prop for prop, name in table.properties.items()})}
+        return pa.schema([pa.field(name, self.arrow_type(column_type)) for name, column_type in table.schema.items()],
+                         metadata=metadata)
+
+    def _to_arrow(self, table: 'Table'):
+        schema = self._arrow_schema(table)
+        arrays = [self.pa.array(table.columns[field.name], type=field.type) for field in schema]
+        return self.pa.Table.from_arrays(arrays, schema=schema)
+
+    def _read(self):
+        try:
+            if self.fmt == 'parquet':
+                import pyarrow.parquet as pq
+                return pq.read_table(self.path)
+            import pyarrow.feather as feather
+            return feather.read_table(self.path)
+        except (OSError, self.pa.ArrowException) as e:
+            raise ExportError(f"Could not read {self.path} ({e})")
+
+    def _write(self, arrow_table):
+        tmp_path = f"{self.path}.tmp"
+        if self.fmt == 'parquet':
+            import pyarrow.parquet as pq
+            pq.write_table(arrow_table, tmp_path, compression='zstd')
+        else:
+            import pyarrow.feather as feather
+            feather.write_feather(arrow_table, tmp_path, compression='zstd')
+        os.replace(tmp_path, self.path)
+
+    def read_state(self) -> ExportState:
+        existing = self._read()
+        metadata = existing.schema.metadata or {}
+        if b'mdquery_schema' not in metadata:
+            raise ExportError(f"{self.path} is not an mdquery export")
+        files = zip(existing.column('file_path').to_pylist(), existing.column('file_size').to_pylist(),
+                    existing.column('file_mtime_ns').to_pylist())
+        self._existing = existing
+        return ExportState(json.loads(metadata[b'mdquery_schema']), json.loads(metadata[b'mdquery_properties']),
+                           {path: (size, mtime_ns) for path, size, mtime_ns in files})
+
+    def write(self, table: 'Table'):
+        self._write(self._to_arrow(table))
+
+    def update(self, state: ExportState, remove: Set[str], table: 'Table'):
+        pa = self.pa
+        import pyarrow.compute as pc
+        existing = self._existing
+        if remove:
+            removed = pc.is_in(existing.column('file_path'), value_set=pa.array(sorted(remove), pa.string()))
+            existing = existing.filter(pc.invert(removed))
+
+        # New properties are null for the kept rows
+        schema = self._arrow_schema(table)
+        arrays = [existing.column(field.name) if field.name in existing.column_names
+                  else pa.nulls(len(existing), field.type) for field in schema]
+        kept = pa.Table.from_arrays(arrays, schema=schema)
+        self._write(pa.concat_tables([kept, self._to_arrow(table)]))
+
+
+def open_writer(path: str, fmt: str):
+    if fmt == 'sqlite':
+        return SqliteWriter(path)
+    if fmt in ('parquet', 'arrow'):
+        return ArrowWriter(path, fmt)
+    raise ExportError(f"Unknown export format '{fmt}' (choose from {', '.join(FORMATS)})")
+
+
+def export_frontmatter(records: List[Dict[str, Any]], path: str, fmt: str,
+                       stats: Callable[[Dict[str, Any]], Tuple[int, int]], append: bool = False) -> Dict[str, Any]:
+    """
+    Write records (mdquery scan results) as a typed, columnar table.
+
+    With append, an existing export is updated instead: rows are added for
+    new files, replaced for files whose size or mtime changed, and removed
+    for files no longer in records. If a column's type has to widen (say a
+    note now has `rating: unknown` where every other rating is a number),
+    the whole export is rewritten.
+
+    Args:
+        records: Scan results ({relative_path, yaml_data, ...})
+        path: Export file
+        fmt: 'parquet', 'arrow' or 'sqlite'
+        stats: Returns (size, mtime_ns) for a record, e.g. from the frontmatter cache
+        append: Update the export at path if there is one
+
+    Returns:
+        rows, columns, and the number of files added, updated and removed
+        (rewritten is True when the whole table was written)
+    """
+    writer = open_writer(path, fmt)
+
+    if append and os.path.exists(path):
+        state = writer.read_state()
+        current = {record['relative_path'] for record in records}
+        changed = [record for record in records if state.files.get(record['relative_path']) != stats(record)]
+        removed = set(state.files) - current
+        updated = sum(1 for record in changed if record['relative_path'] in state.files)
+
+        names = {prop: name for name, prop in state.properties.items()}
+        existing_types = {prop: state.schema[name] for prop, name in names.items()}
+        property_types = infer_schema(changed, existing_types)
+        if all(property_types[prop] == column_type for prop, column_type in existing_types.items()):
+            table = Table(changed, stats, property_types, names, writer.IGNORE_CASE)
+            if changed or removed:
+                writer.update(state, removed | {record['relative_path'] for record in changed}, table)
+            return {'rows': len(records), 'columns': len(table.schema), 'added': len(changed) - updated,
+                    'updated': updated, 'removed': len(removed), 'rewritten': False}
+
+    table = Table(records, stats, infer_schema(records), ignore_case=writer.IGNORE_CASE)
+    writer.write(table)
+    return {'rows': len(records), 'columns': len(table.schema), 'added': len(records),
+            'updated': 0, 'removed': 0, 'rewritten': True}
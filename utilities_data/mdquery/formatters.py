@@ -4,7 +4,8 @@ Output formatters for mdquery - handles all result formatting and display
 
 import json
 import csv
-from typing import Dict, List, Any, Optional
+from itertools import chain
+from typing import Dict, List, Any, Iterable, Iterator, Optional
 
 
 def csv_safe_value(value):
@@ -12,94 +13,131 @@ def csv_safe_value(value):
     return json.dumps(value) if isinstance(value, (list, dict)) else str(value)
 
 
-def format_output(results: List[Dict[str, Any]], output_format: str, fields: Optional[str] = None, csv_file: str = 'mdquery.csv'):
-    """Format search results according to specified format"""
-    if not results:
+def json_record(file_data: Dict[str, Any], field_list: Optional[List[str]]) -> Dict[str, Any]:
+    """The JSON/NDJSON object for one result"""
+    if field_list:
+        return {
+            'file_path': file_data['relative_path'],
+            'fields': {field: file_data['yaml_data'].get(field, None) for field in field_list}
+        }
+    return {
+        'file_path': file_data['relative_path'],
+        'yaml_data': file_data['yaml_data']
+    }
+
+
+def write_json(results: Iterator[Dict[str, Any]], field_list: Optional[List[str]]):
+    """Write a JSON array one element at a time (same text as json.dumps(..., indent=2) of the whole list)"""
+    encoder = json.JSONEncoder(indent=2, default=str)
+    print('[')
+    for position, file_data in enumerate(results):
+        element = encoder.encode(json_record(file_data, field_list))
+        print((',\n  ' if position else '  ') + element.replace('\n', '\n  '), end='')
+    print('\n]')
+
+
+def write_ndjson(results: Iterator[Dict[str, Any]], field_list: Optional[List[str]]):
+    """Write one compact JSON object per line"""
+    encoder = json.JSONEncoder(ensure_ascii=False, default=str)
+    for file_data in results:
+        print(encoder.encode(json_record(file_data, field_list)))
+
+
+def write_table(results: Iterator[Dict[str, Any]], field_list: List[str]):
+    """Write fixed-width rows; column widths are fixed so rows can be printed as they arrive"""
+    # Print header
+    print(f"{'File':<40} | {' | '.join(f'{f:<20}' for f in field_list)}")
+    print('-' * (42 + sum(22 for _ in field_list)))
+    
+    # Print rows
+    for file_data in results:
+        field_values = []
+        for field in field_list:
+            if field in file_data['yaml_data']:
+                value = file_data['yaml_data'][field]
+                if isinstance(value, list):
+                    value = ', '.join(str(v) for v in value[:3])  # Limit list display
+                    if len(file_data['yaml_data'][field]) > 3:
+                        value += '...'
+                value = str(value)[:20]  # Truncate long values
+            else:
+                value = 'N/A'
+            field_values.append(f'{value:<20}')
+        
+        filename = file_data['relative_path'][:40]  # Truncate long paths
+        print(f"{filename:<40} | {' | '.join(field_values)}")
+
+
+def write_csv(results: Iterator[Dict[str, Any]], field_list: List[str], csv_file: str):
+    """Write rows to csv_file as they arrive"""
+    with open(csv_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        
+        # Write header
+        writer.writerow(['file_path'] + field_list)
+        
+        # Write data rows
+        for file_data in results:
+            row = [file_data['relative_path']]
+            for field in field_list:
+                value = file_data['yaml_data'].get(field, None)
+                row.append(csv_safe_value(value))
+            writer.writerow(row)
+    
+    print(f"CSV exported to {csv_file}")
+
+
+def write_list(results: Iterator[Dict[str, Any]], field_list: Optional[List[str]]):
+    """Write one line per result"""
+    for file_data in results:
+        if field_list:
+            field_values = []
+            for field in field_list:
+                if field in file_data['yaml_data']:
+                    value = file_data['yaml_data'][field]
+                    if isinstance(value, list):
+                        value = ', '.join(str(v) for v in value)
+                    field_values.append(f"{field}: {value}")
+                else:
+                    field_values.append(f"{field}: N/A")
+            print(f"{file_data['relative_path']} | {' | '.join(field_values)}")
+        else:
+            print(file_data['relative_path'])
+
+
+def format_output(results: Iterable[Dict[str, Any]], output_format: str, fields: Optional[str] = None, csv_file: str = 'mdquery.csv'):
+    """
+    Format search results according to specified format.
+    
+    results may be a list or a generator; each result is written as soon as
+    it arrives and nothing is kept, so output starts while a streaming scan
+    is still running.
+    """
+    results = iter(results)
+    first = next(results, None)
+    if first is None:
         print("No matching files found.")
         return
+    results = chain([first], results)
+    field_list = [f.strip() for f in fields.split(',')] if fields else None
     
     if output_format == 'json':
-        output_data = []
-        for file_data in results:
-            if fields:
-                field_list = [f.strip() for f in fields.split(',')]
-                filtered_data = {
-                    'file_path': file_data['relative_path'],
-                    'fields': {}
-                }
-                for field in field_list:
-                    filtered_data['fields'][field] = file_data['yaml_data'].get(field, None)
-                output_data.append(filtered_data)
-            else:
-                output_data.append({
-                    'file_path': file_data['relative_path'],
-                    'yaml_data': file_data['yaml_data']
-                })
-        print(json.dumps(output_data, indent=2, default=str))
-        
+        write_json(results, field_list)
+    
+    elif output_format == 'ndjson':
+        write_ndjson(results, field_list)
+    
     elif output_format == 'table':
-        if fields:
-            field_list = [f.strip() for f in fields.split(',')]
-            # Print header
-            print(f"{'File':<40} | {' | '.join(f'{f:<20}' for f in field_list)}")
-            print('-' * (42 + sum(22 for _ in field_list)))
-            
-            # Print rows
-            for file_data in results:
-                field_values = []
-                for field in field_list:
-                    if field in file_data['yaml_data']:
-                        value = file_data['yaml_data'][field]
-                        if isinstance(value, list):
-                            value = ', '.join(str(v) for v in value[:3])  # Limit list display
-                            if len(file_data['yaml_data'][field]) > 3:
-                                value += '...'
-                        value = str(value)[:20]  # Truncate long values
-                    else:
-                        value = 'N/A'
-                    field_values.append(f'{value:<20}')
-                
-                filename = file_data['relative_path'][:40]  # Truncate long paths
-                print(f"{filename:<40} | {' | '.join(field_values)}")
+        if field_list:
+            write_table(results, field_list)
         else:
             print("Table format requires --fields option")
     
     elif output_format == 'csv':
-        if not fields:
+        if not field_list:
             print("CSV format requires --fields option")
             return
-        
-        field_list = [f.strip() for f in fields.split(',')]
-        
-        with open(csv_file, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            
-            # Write header
-            writer.writerow(['file_path'] + field_list)
-            
-            # Write data rows
-            for file_data in results:
-                row = [file_data['relative_path']]
-                for field in field_list:
-                    value = file_data['yaml_data'].get(field, None)
-                    row.append(csv_safe_value(value))
-                writer.writerow(row)
-        
-        print(f"CSV exported to {csv_file}")
-            
+        write_csv(results, field_list, csv_file)
+    
     else:  # list format (default)
-        for file_data in results:
-            if fields:
-                field_list = [f.strip() for f in fields.split(',')]
-                field_values = []
-                for field in field_list:
-                    if field in file_data['yaml_data']:
-                        value = file_data['yaml_data'][field]
-                        if isinstance(value, list):
-                            value = ', '.join(str(v) for v in value)
-                        field_values.append(f"{field}: {value}")
-                    else:
-                        field_values.append(f"{field}: N/A")
-                print(f"{file_data['relative_path']} | {' | '.join(field_values)}")
-            else:
-                print(file_data['relative_path'])
\ No newline at end of file
+        write_list(results, field_list)
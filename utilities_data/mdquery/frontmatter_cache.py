@@ -0,0 +1,191 @@
+"""
+Persistent frontmatter index for mdquery - caches parsed YAML keyed by path, size and mtime
+"""
+
+import base64
+import datetime
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+CACHE_FILENAME = '.mdquery-cache.sqlite'
+SCHEMA_VERSION = 2
+
+# Marks a JSON object standing for a value JSON has no type for
+TAG = '$t'
+
+
+def encode_value(value: Any) -> Any:
+    """
+    A JSON-serializable form of a YAML safe_load result that decode_value() turns back into it.
+
+    Dates, datetimes, binary, sets and mappings with non-string keys (or a
+    key that looks like the tag) become {"$t": type, "v": ...} objects.
+    Raises TypeError for anything a safe load can't produce.
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, list):
+        return [encode_value(item) for item in value]
+    if isinstance(value, dict):
+        if TAG in value or not all(isinstance(key, str) for key in value):
+            return {TAG: 'map', 'v': [[encode_value(k), encode_value(v)] for k, v in value.items()]}
+        return {key: encode_value(item) for key, item in value.items()}
+    # datetime is a subclass of date, so it's checked first
+    if isinstance(value, datetime.datetime):
+        return {TAG: 'datetime', 'v': value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {TAG: 'date', 'v': value.isoformat()}
+    if isinstance(value, bytes):
+        return {TAG: 'bytes', 'v': base64.b64encode(value).decode('ascii')}
+    if isinstance(value, (set, frozenset)):
+        return {TAG: 'set', 'v': [encode_value(item) for item in value]}
+    raise TypeError(f"can't cache a {type(value).__name__}")
+
+
+def _decode_object(obj: Dict) -> Any:
+    kind = obj.get(TAG)
+    if kind is None or len(obj) != 2:
+        return obj
+    value = obj['v']
+    if kind == 'map':
+        return {key: item for key, item in value}
+    if kind == 'datetime':
+        return datetime.datetime.fromisoformat(value)
+    if kind == 'date':
+        return datetime.date.fromisoformat(value)
+    if kind == 'bytes':
+        return base64.b64decode(value)
+    if kind == 'set':
+        return set(value)
+    return obj
+
+
+def decode_value(text: str) -> Any:
+    """Inverse of json.dumps(encode_value(value)); plain JSON data is returned as is"""
+    if TAG not in text:
+        return json.loads(text)
+    return json.loads(text, object_hook=_decode_object)
+
+
+class FrontmatterCache:
+    """
+    SQLite-backed index of parsed frontmatter.
+
+    Each row stores the relative path of a note, the size and mtime (ns) the
+    note had when it was parsed, and the result of the YAML parse as JSON
+    (see encode_value; null for files without front matter). A row is only
+    reused when both size and mtime still match the file on disk.
+
+    Rows also record the absolute folder they were scanned from, so one
+    --cache-file shared by several folders keeps them apart. The cache is
+    plain data: a tampered cache file can give wrong results but can't run
+    code.
+    """
+
+    def __init__(self, directory: Path, cache_file: Optional[str] = None):
+        self.directory = Path(directory)
+        self.db_path = Path(cache_file) if cache_file else self.directory / CACHE_FILENAME
+        self.root = os.path.abspath(self.directory)
+        self.conn = sqlite3.connect(str(self.db_path))
+        self._ensure_schema()
+        self.entries = self._load_entries()
+        self.pending = []
+        self.hits = 0
+        self.misses = 0
+
+    def _ensure_schema(self):
+        """Create tables, dropping the index if it was written by another schema version"""
+        version = self.conn.execute('PRAGMA user_version').fetchone()[0]
+        if version != SCHEMA_VERSION:
+            self.conn.execute('DROP TABLE IF EXISTS files')
+            self.conn.execute('DROP TABLE IF EXISTS meta')
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS files (
+                root TEXT NOT NULL,
+                path TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                yaml_data TEXT NOT NULL,
+                PRIMARY KEY (root, path)
+            )
+        """)
+        self.conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+        self.conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        self.conn.commit()
+
+    def _load_entries(self) -> Dict[str, Tuple[int, int, str]]:
+        """Load this folder's rows into memory; payloads are only decoded on a hit"""
+        rows = self.conn.execute('SELECT path, size, mtime_ns, yaml_data FROM files WHERE root = ?', (self.root,))
+        return {path: (size, mtime_ns, blob) for path, size, mtime_ns, blob in rows}
+
+    def lookup(self, rel_path: str, stat: os.stat_result) -> Tuple[bool, Any]:
+        """Return (hit, yaml_data) for a file given its current stat"""
+        entry = self.entries.get(rel_path)
+        if entry is None or entry[0] != stat.st_size or entry[1] != stat.st_mtime_ns:
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        return True, decode_value(entry[2])
+
+    def store(self, rel_path: str, stat: os.stat_result, yaml_data: Any):
+        """Queue a freshly parsed file for writing on the next commit (values JSON can't hold aren't cached)"""
+        try:
+            text = json.dumps(encode_value(yaml_data), ensure_ascii=False)
+        except (TypeError, ValueError):
+            return
+        self.entries[rel_path] = (stat.st_size, stat.st_mtime_ns, text)
+        self.pending.append((self.root, rel_path, stat.st_size, stat.st_mtime_ns, text))
+
+    def evict_missing(self, seen_paths: Iterable[str]) -> int:
+        """
+        Drop rows for files that no longer exist.
+
+        Rows not seen by the current scan (e.g. a --no-recursive run or a
+        different --pattern) are only evicted if the file is really gone.
+        """
+        seen = set(seen_paths)
+        stale = [path for path in self.entries
+                 if path not in seen and not (self.directory / path).exists()]
+        for path in stale:
+            del self.entries[path]
+        if stale:
+            self.conn.executemany('DELETE FROM files WHERE root = ? AND path = ?', [(self.root, p) for p in stale])
+        return len(stale)
+
+    def commit(self):
+        """Write queued rows and record when the index was last updated"""
+        if self.pending:
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO files (root, path, size, mtime_ns, yaml_data) VALUES (?, ?, ?, ?, ?)',
+                self.pending
+            )
+            self.pending = []
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('updated', ?)",
+                          (str(time.time()),))
+        self.conn.commit()
+
+    def clear(self):
+        """Remove every cached row for this folder (used by --rebuild-cache)"""
+        self.conn.execute('DELETE FROM files WHERE root = ?', (self.root,))
+        self.conn.commit()
+        self.entries = {}
+        self.pending = []
+
+    def info(self) -> Dict[str, Any]:
+        """Describe the cache for --cache-info"""
+        with_yaml = sum(1 for entry in self.entries.values() if entry[2] != 'null')
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'updated'").fetchone()
+        return {
+            'cache_file': str(self.db_path),
+            'size_bytes': self.db_path.stat().st_size if self.db_path.exists() else 0,
+            'entries': len(self.entries),
+            'entries_with_yaml': with_yaml,
+            'last_updated': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(float(row[0]))) if row else 'never'
+        }
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,190 @@
+"""
+In-memory search indexes for mdquery - inverted property/tag indexes and a trigram text index over scanned frontmatter
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+# Shortest search text the trigram index can answer; shorter text is matched by scanning
+TRIGRAM = 3
+
+
+def _trigrams(text: str) -> Set[str]:
+    return {text[i:i + TRIGRAM] for i in range(len(text) - TRIGRAM + 1)}
+
+
+def _text_values(yaml_data: Dict[str, Any]) -> List[str]:
+    """Lower-cased string values (and string list items) searched by --search"""
+    values = []
+    for value in yaml_data.values():
+        if isinstance(value, str):
+            values.append(value.lower())
+        elif isinstance(value, list):
+            values.extend(item.lower() for item in value if isinstance(item, str))
+    return values
+
+
+class SearchIndex:
+    """
+    Inverted indexes over files_data, addressed by file id (position in files_data).
+
+    Each index is built on first use and reused for the rest of the scan:
+      - property index: key -> {str(value) -> ids}; list values index each item
+      - tag index: tag property -> {tag -> ids} for string items of list values
+      - text index: trigram -> ids over lower-cased string values
+
+    Filters evaluate to id sets, which are intersected smallest first; results
+    come back in scan order. The text index costs more to build than a single
+    scan, so it is only built when index_text is set (e.g. for long-lived
+    processes answering many queries); otherwise text is matched by scanning
+    the candidates left after the other filters.
+    """
+
+    def __init__(self, files_data: List[Dict[str, Any]], index_text: bool = False):
+        self.files_data = files_data
+        self.index_text = index_text
+        self._property_index: Dict[str, Dict[str, Set[int]]] = {}
+        self._tag_index: Dict[str, Dict[str, Set[int]]] = {}
+        self._text_values: Optional[List[List[str]]] = None
+        self._trigram_index: Optional[Dict[str, Set[int]]] = None
+
+    def _values_for(self, key: str) -> Dict[str, Set[int]]:
+        index = self._property_index.get(key)
+        if index is None:
+            index = {}
+            for file_id, file_data in enumerate(self.files_data):
+                yaml_data = file_data['yaml_data']
+                if key not in yaml_data:
+                    continue
+                value = yaml_data[key]
+                for item in (value if isinstance(value, list) else [value]):
+                    index.setdefault(str(item), set()).add(file_id)
+            self._property_index[key] = index
+        return index
+
+    def _tags_for(self, tag_property: str) -> Dict[str, Set[int]]:
+        index = self._tag_index.get(tag_property)
+        if index is None:
+            index = {}
+            for file_id, file_data in enumerate(self.files_data):
+                file_tags = file_data['yaml_data'].get(tag_property)
+                if isinstance(file_tags, list):
+                    for tag in file_tags:
+                        if isinstance(tag, str):
+                            index.setdefault(tag, set()).add(file_id)
+            self._tag_index[tag_property] = index
+        return index
+
+    def _text(self) -> List[List[str]]:
+        if self._text_values is None:
+            self._text_values = [_text_values(file_data['yaml_data']) for file_data in self.files_data]
+        return self._text_values
+
+    def _trigrams(self) -> Dict[str, Set[int]]:
+        if self._trigram_index is None:
+            index = {}
+            for file_id, values in enumerate(self._text()):
+                grams = set()
+                for value in values:
+                    grams |= _trigrams(value)
+                for gram in grams:
+                    index.setdefault(gram, set()).add(file_id)
+            self._trigram_index = index
+        return self._trigram_index
+
+    def property_ids(self, key: str, value: str) -> Set[int]:
+        """Files where str(key's value), or str() of an item of a list value, equals value"""
+        return self._values_for(key).get(value, set())
+
+    def tag_ids(self, tags: List[str], tag_property: str = 'ai_tags') -> Set[int]:
+        """Files whose tag_property list contains every tag"""
+        index = self._tags_for(tag_property)
+        if not tags:
+            return {file_id for file_id, file_data in enumerate(self.files_data)
+                    if isinstance(file_data['yaml_data'].get(tag_property), list)}
+        return intersect([index.get(tag, set()) for tag in tags])
+
+    def text_ids(self, search_text: str, candidates: Optional[Set[int]] = None) -> Set[int]:
+        """
+        Files with a string value (or string list item) containing search_text, case-insensitively.
+
+        Args:
+            candidates: Only consider these ids (None for every file)
+        """
+        search_text = search_text.lower()
+        if self.index_text and len(search_text) >= TRIGRAM:
+            postings = [self._trigrams().get(gram, set()) for gram in _trigrams(search_text)]
+            if candidates is not None:
+                postings.append(candidates)
+            candidates = intersect(postings)
+        elif candidates is None:
+            candidates = range(len(self.files_data))
+
+        # Trigram hits are candidates only: confirm the substring within a single value
+        if self._text_values is not None:
+            text = self._text_values
+            return {file_id for file_id in candidates if any(search_text in value for value in text[file_id])}
+        files_data = self.files_data
+        return {file_id for file_id in candidates
+                if any(search_text in value for value in _text_values(files_data[file_id]['yaml_data']))}
+
+    def query(self, property_filters: Iterable[Tuple[str, str]] = (), tags: Optional[List[str]] = None,
+              search_text: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Files matching every given filter, in scan order.
+
+        Args:
+            property_filters: Parsed (key, value) pairs
+            tags: Tags that must all be present
+            search_text: Text that must appear in some value
+        """
+        sets = [self.property_ids(key, value) for key, value in property_filters]
+        if tags:
+            sets.append(self.tag_ids(tags))
+        ids = intersect(sets) if sets else None
+        if search_text is not None:
+            ids = self.text_ids(search_text, ids)
+        if ids is None:
+            return list(self.files_data)
+        return [self.files_data[file_id] for file_id in sorted(ids)]
+
+
+def matches(yaml_data: Dict[str, Any], property_filters: Iterable[Tuple[str, str]] = (),
+            tags: Optional[List[str]] = None, search_text: Optional[str] = None,
+            tag_property: str = 'ai_tags') -> bool:
+    """
+    Whether one file passes every filter, by the same rules the indexes use.
+
+    For streaming a scan without building indexes; SearchIndex.query is
+    faster when the same files are queried repeatedly.
+    """
+    for key, value in property_filters:
+        if key not in yaml_data:
+            return False
+        actual = yaml_data[key]
+        if not any(str(item) == value for item in (actual if isinstance(actual, list) else [actual])):
+            return False
+    if tags:
+        file_tags = yaml_data.get(tag_property)
+        if not isinstance(file_tags, list):
+            return False
+        file_tags = {tag for tag in file_tags if isinstance(tag, str)}
+        if not all(tag in file_tags for tag in tags):
+            return False
+    if search_text is not None:
+        search_text = search_text.lower()
+        if not any(search_text in value for value in _text_values(yaml_data)):
+            return False
+    return True
+
+
+def intersect(sets: List[Set[int]]) -> Set[int]:
+    """Intersect id sets, smallest first so the work is bounded by the most selective filter"""
+    if not sets:
+        return set()
+    sets = sorted(sets, key=len)
+    result = set(sets[0])
+    for ids in sets[1:]:
+        if not result:
+            break
+        result &= ids
+    return result
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Persistent backlink index for obsidian_mv and obsidian_query.
+Maps every note to the notes linking to it, with the span of each link, so
+reference lookups don't need a Dataview query or a download of every
+candidate file. The index is brought up to date incrementally (only notes
+whose size or mtime changed are re-read) before it answers anything.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from link_rewriter import LinkRewriter, iter_links
+
+BACKLINK_INDEX_FILE = "backlinks.sqlite"
+SCHEMA_VERSION = 1
+
+# One search returning the size and mtime of every note, to find what changed since the last refresh
+VERSION_LOGIC = {"if": [True, [{"var": "stat.size"}, {"var": "stat.mtime"}], False]}
+
+
+def _link_key(note_target: str) -> str:
+    """Last path component of a link target; every link to a note shares its note's."""
+    name = note_target[:-3] if note_target.endswith('.md') else note_target
+    return name.rstrip('/').split('/')[-1]
+
+
+def parse_links(content: str) -> List[List]:
+    """[start, end, note target, link text] for every link in a note."""
+    return [[link.start, link.end, content[link.target_start:link.target_end], link.text(content)]
+            for link in iter_links(content)]
+
+
+class BacklinkIndex:
+    """
+    SQLite-backed index of the links in every note.
+
+    Each row stores a note's path, a version string (size and mtime, from
+    disk when the vault is local or from Obsidian's stat otherwise) and the
+    note's links. refresh() compares versions with the vault and re-reads
+    only what changed; rows for deleted notes are dropped. An index built
+    for a different vault (other vault_root or API URL) is discarded.
+    """
+
+    def __init__(self, api, db_path: Optional[Path] = None):
+        self.api = api
+        self.db_path = Path(db_path) if db_path else api.get_cache_dir() / BACKLINK_INDEX_FILE
+        self.local_root = api.get_local_vault_root()
+        self.source = f"local:{self.local_root}" if self.local_root else f"api:{api.api_base_url}"
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # Lookups can come from obsidian_mv's worker threads; the lock serializes them
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._lock = threading.RLock()
+        self._ensure_schema()
+        self.entries = self._load_entries()
+        self._by_key = None
+
+    def _ensure_schema(self):
+        """Create tables, dropping the index if it belongs to another schema version or vault"""
+        version = self.conn.execute('PRAGMA user_version').fetchone()[0]
+        source = None
+        if version == SCHEMA_VERSION:
+            try:
+                row = self.conn.execute("SELECT value FROM meta WHERE key = 'source'").fetchone()
+                source = row[0] if row else None
+            except sqlite3.Error:
+                pass
+        if version != SCHEMA_VERSION or source != self.source:
+            self.conn.execute('DROP TABLE IF EXISTS notes')
+            self.conn.execute('DROP TABLE IF EXISTS meta')
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS notes (
+                path TEXT PRIMARY KEY,
+                version TEXT NOT NULL,
+                links TEXT NOT NULL
+            )
+        """)
+        self.conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('source', ?)", (self.source,))
+        self.conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        self.conn.commit()
+
+    def _load_entries(self) -> Dict[str, Tuple[str, List[List]]]:
+        rows = self.conn.execute('SELECT path, version, links FROM notes')
+        return {path: (version, json.loads(links)) for path, version, links in rows}
+
+    def _current_versions(self) -> Optional[Dict[str, str]]:
+        """Version of every note in the vault right now, or None if the server can't report them."""
+        if self.local_root is not None:
+            versions = {}
+            for path in self.api.list_vault_files(refresh=True):
+                if not path.endswith('.md'):
+                    continue
+                try:
+                    stat = os.stat(self.local_root / path)
+                except OSError:
+                    continue
+                versions[path] = f"{stat.st_size}:{stat.st_mtime_ns}"
+            return versions
+
+        results = self.api.search_jsonlogic(VERSION_LOGIC)
+        if results is None:
+            return None
+        versions = {}
+        for hit in results:
+            values = hit.get('result')
+            if isinstance(values, list) and len(values) == 2:
+                versions[hit['filename']] = f"{values[0]}:{values[1]}"
+        return versions
+
+    def _read_notes(self, paths: List[str]) -> Dict[str, Optional[str]]:
+        if self.local_root is None:
+            return self.api.get_many_file_contents(paths)
+        contents = {}
+        for path in paths:
+            try:
+                # newline='' keeps CRLF, so link offsets match the file (and the REST API's content)
+                with open(self.local_root / path, 'r', encoding='utf-8', errors='replace', newline='') as f:
+                    contents[path] = f.read()
+            except OSError:
+                contents[path] = None
+        return contents
+
+    def refresh(self) -> Optional[Dict[str, int]]:
+        """
+        Bring the index up to date with the vault.
+
+        Returns:
+            {'notes', 'updated', 'removed'}, or None if the vault's current state
+            couldn't be determined (the index must not be trusted then)
+        """
+        with self._lock, self.api.tracer.span('backlink_index.refresh') as span:
+            with self.api.tracer.span('backlink_index.versions', source=self.source):
+                versions = self._current_versions()
+            if versions is None:
+                return None
+
+            changed = [path for path, version in versions.items()
+                       if path not in self.entries or self.entries[path][0] != version]
+            removed = [path for path in self.entries if path not in versions]
+
+            with self.api.tracer.span('backlink_index.read_notes', notes=len(changed)):
+                contents = self._read_notes(changed)
+            rows = []
+            for path, content in contents.items():
+                if content is None:
+                    continue
+                links = parse_links(content)
+                self.entries[path] = (versions[path], links)
+                rows.append((path, versions[path], json.dumps(links)))
+            for path in removed:
+                del self.entries[path]
+
+            if rows:
+                self.conn.executemany('INSERT OR REPLACE INTO notes (path, version, links) VALUES (?, ?, ?)', rows)
+            if removed:
+                self.conn.executemany('DELETE FROM notes WHERE path = ?', [(path,) for path in removed])
+            self.conn.commit()
+            self._by_key = None
+            span.update(notes=len(self.entries), updated=len(rows), removed=len(removed))
+            return {'notes': len(self.entries), 'updated': len(rows), 'removed': len(removed)}
+
+    def _links_by_key(self) -> Dict[str, List[Tuple[str, List]]]:
+        if self._by_key is None:
+            by_key = {}
+            for path, (_, links) in self.entries.items():
+                for link in links:
+                    by_key.setdefault(_link_key(link[2]), []).append((path, link))
+            self._by_key = by_key
+        return self._by_key
+
+    def backlinks(self, target_note: str) -> List[Tuple[str, List[Dict]]]:
+        """
+        Notes linking to target_note, with their links to it.
+
+        Uses the same matching rules as ObsidianAPI.extract_link_references.
+
+        Returns:
+            [(referring path, [{'start', 'end', 'text'}, ...])] sorted by path
+        """
+        with self._lock:
+            resolver = LinkRewriter([(target_note, target_note)])
+            referrers = {}
+            for path, link in self._links_by_key().get(_link_key(target_note), []):
+                if resolver.resolve(link[2]):
+                    referrers.setdefault(path, []).append({'start': link[0], 'end': link[1], 'text': link[3]})
+            return sorted(referrers.items())
+
+    def links(self, path: str) -> List[str]:
+        """Text of every link in a note, as of the last refresh."""
+        with self._lock:
+            entry = self.entries.get(path)
+            return [link[3] for link in entry[1]] if entry else []
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Single-pass wikilink rewriter for obsidian_mv.
+Finds every [[...]] and ![[...]] link in a note once, resolves its target
+against a precompiled table of renames and splices replacements in by span,
+so renaming many notes costs one linear pass per file.
+"""
+
+import re
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+# (optional !)[[inner]]
+LINK_PATTERN = re.compile(r'(!?)\[\[([^\]]+)\]\]')
+
+
+class WikiLink(NamedTuple):
+    """
+    One link found in a note.
+
+    start/end span the whole link in the content; target_start/target_end
+    span the note part of the target (inside the brackets, before any
+    #anchor or |alias, surrounding whitespace excluded).
+    """
+    start: int
+    end: int
+    target_start: int
+    target_end: int
+    embed: bool
+
+    def text(self, content: str) -> str:
+        return content[self.start:self.end]
+
+
+def _strip_md(name: str) -> str:
+    return name[:-3] if name.endswith('.md') else name
+
+
+def iter_links(content: str):
+    """
+    Yield every link in content that points at another note.
+
+    Search helpers ([[## ...]], [[^^ ...]]) and same-note anchors ([[#...]])
+    are skipped since they don't reference a note.
+    """
+    for match in LINK_PATTERN.finditer(content):
+        inner_start, inner_end = match.span(2)
+        if content.startswith(('## ', '^^ ', '#'), inner_start, inner_end):
+            continue
+
+        # The note part ends at the first | (alias), then at the first # (heading/block)
+        pipe = content.find('|', inner_start, inner_end)
+        target_end = pipe if pipe != -1 else inner_end
+        hash_pos = content.find('#', inner_start, target_end)
+        if hash_pos != -1:
+            target_end = hash_pos
+
+        target_start = inner_start
+        while target_start < target_end and content[target_start].isspace():
+            target_start += 1
+        while target_end > target_start and content[target_end - 1].isspace():
+            target_end -= 1
+
+        yield WikiLink(match.start(), match.end(), target_start, target_end, bool(match.group(1)))
+
+
+class Rename:
+    """One old -> new rename with the name forms links may use precomputed."""
+
+    def __init__(self, old_name: str, new_name: str):
+        self.old_name = old_name
+        self.old_base = _strip_md(old_name)
+        self.new_base = _strip_md(new_name)
+        self.old_filename = self.old_base.split('/')[-1]
+        self.new_filename = self.new_base.split('/')[-1]
+
+    def retarget(self, note_target: str) -> str:
+        """
+        Map a link's note part to the new name, keeping the form it was written in
+        (full path, bare filename, leading slash, .md extension, relative path).
+        """
+        old_base, new_base = self.old_base, self.new_base
+        if note_target == old_base or note_target == self.old_name:
+            return new_base
+        if note_target == f"{old_base}.md":
+            return f"{new_base}.md"
+        if note_target == self.old_filename:
+            return self.new_filename
+        if note_target == f"{self.old_filename}.md":
+            return f"{self.new_filename}.md"
+        if note_target.startswith('/'):
+            if note_target == f"/{old_base}" or note_target == f"/{self.old_name}":
+                return f"/{new_base}"
+            if note_target == f"/{old_base}.md":
+                return f"/{new_base}.md"
+            return note_target
+        if '/' in note_target:
+            # Relative path - replace the last component
+            head, _, last_part = note_target.rpartition('/')
+            if last_part == self.old_filename:
+                return f"{head}/{self.new_filename}"
+            if last_part == f"{self.old_filename}.md":
+                return f"{head}/{self.new_filename}.md"
+        return note_target
+
+
+class LinkRewriter:
+    """
+    Rewrites links to any of a set of renamed notes in one pass over a note.
+
+    A link refers to a renamed note when its target (without .md or a leading
+    slash) equals the old path, is a '/'-suffix of it (e.g. the bare note
+    name), or ends with '/' + the old path. Targets are resolved with two
+    dictionaries built once per batch, so the cost per link doesn't grow
+    with the number of renames. When several renames match a link, the
+    first one wins and the link is rewritten only once.
+    """
+
+    def __init__(self, renames: Sequence[Tuple[str, str]]):
+        self.renames = [Rename(old_name, new_name) for old_name, new_name in renames]
+        # Every '/'-suffix of an old path (including the whole path) -> first rename using it
+        self._by_suffix: Dict[str, int] = {}
+        # Whole old paths -> first rename, for links written with a longer path
+        self._by_path: Dict[str, int] = {}
+        for index, rename in enumerate(self.renames):
+            parts = rename.old_base.split('/')
+            for i in range(len(parts)):
+                self._by_suffix.setdefault('/'.join(parts[i:]), index)
+            self._by_path.setdefault(rename.old_base, index)
+
+    def resolve(self, note_target: str) -> Optional[Rename]:
+        """Return the rename a link's note part refers to, if any."""
+        link_base = _strip_md(note_target).lstrip('/')
+        best = self._by_suffix.get(link_base)
+        slash = link_base.find('/')
+        while slash != -1:
+            index = self._by_path.get(link_base[slash + 1:])
+            if index is not None and (best is None or index < best):
+                best = index
+            slash = link_base.find('/', slash + 1)
+        return None if best is None else self.renames[best]
+
+    def references(self, content: str) -> List[str]:
+        """Every link in content that refers to one of the renamed notes, in order."""
+        return [link.text(content) for link in iter_links(content)
+                if self.resolve(content[link.target_start:link.target_end])]
+
+    def rewrite(self, content: str) -> Tuple[str, List[Dict[str, str]]]:
+        """
+        Rewrite every link to a renamed note.
+
+        Only the note part of each link is replaced; anchors, aliases,
+        embed prefixes and whitespace are left exactly as written.
+
+        Returns:
+            (new content, list of {'original', 'replacement'} for each matching link)
+        """
+        changes = []
+        pieces = []
+        last_end = 0
+        for link in iter_links(content):
+            note_target = content[link.target_start:link.target_end]
+            rename = self.resolve(note_target)
+            if rename is None:
+                continue
+            new_target = rename.retarget(note_target)
+            original = link.text(content)
+            replacement = (content[link.start:link.target_start] + new_target +
+                           content[link.target_end:link.end])
+            changes.append({'original': original, 'replacement': replacement})
+            if replacement != original:
+                pieces.append(content[last_end:link.start])
+                pieces.append(replacement)
+                last_end = link.end
+
+        if last_end == 0:
+            return content, changes
+        pieces.append(content[last_end:])
+        return ''.join(pieces), changes
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Note metadata cache for obsidian_query.
+Keeps the note+json responses (path, frontmatter, tags, stat and optionally
+content) of the notes a run has fetched, so the same note is never
+downloaded twice. The in-memory layer is an LRU bounded by a size cap; the
+optional persistent layer (notes.sqlite in cache_dir) carries full notes across
+runs and only returns one when its version - the size and mtime Obsidian
+reports - still matches.
+"""
+
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+NOTE_CACHE_FILE = "notes.sqlite"
+SCHEMA_VERSION = 1
+DEFAULT_NOTE_CACHE_MB = 64
+
+# Rows written to the persistent layer between commits
+COMMIT_EVERY = 200
+
+
+def note_version(note: Dict) -> Optional[str]:
+    """Version ("size:mtime") from a note's stat, as ObsidianAPI.note_versions() reports it"""
+    stat = note.get('stat') or {}
+    if 'size' in stat and 'mtime' in stat:
+        return f"{stat['size']}:{stat['mtime']}"
+    return None
+
+
+class NoteCache:
+    """
+    LRU cache of note data keyed by path, with an optional SQLite layer.
+
+    Entries remember whether they include the note body: a lookup that needs
+    content misses on a metadata-only entry, while a metadata-only lookup is
+    served from either (content stripped). Memory use is estimated from the
+    serialized size of each entry and kept under max_bytes by evicting the
+    least recently used notes.
+    """
+
+    def __init__(self, max_bytes: int, db_path: Optional[Path] = None, source: str = ''):
+        self.max_bytes = max_bytes
+        self.entries: 'OrderedDict[str, tuple]' = OrderedDict()  # path -> (version, note, has_content, size)
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self._lock = threading.RLock()
+        self._pending = 0
+
+        self.conn = None
+        if db_path is not None:
+            try:
+                db_path.parent.mkdir(parents=True, exist_ok=True)
+                # Lookups come from obsidian_query's worker threads; the lock serializes them
+                self.conn = sqlite3.connect(str(db_path), check_same_thread=False)
+                self._ensure_schema(source)
+            except (OSError, sqlite3.Error):
+                self.conn = None
+
+    def _ensure_schema(self, source: str):
+        """Create the table, dropping the cache if it belongs to another schema version or API"""
+        version = self.conn.execute('PRAGMA user_version').fetchone()[0]
+        cached_source = None
+        if version == SCHEMA_VERSION:
+            try:
+                row = self.conn.execute("SELECT value FROM meta WHERE key = 'source'").fetchone()
+                cached_source = row[0] if row else None
+            except sqlite3.Error:
+                pass
+        if version != SCHEMA_VERSION or cached_source != source:
+            self.conn.execute('DROP TABLE IF EXISTS notes')
+            self.conn.execute('DROP TABLE IF EXISTS meta')
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS notes (
+                path TEXT PRIMARY KEY,
+                version TEXT NOT NULL,
+                has_content INTEGER NOT NULL,
+                data TEXT NOT NULL
+            )
+        """)
+        self.conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('source', ?)", (source,))
+        self.conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        self.conn.commit()
+
+    @property
+    def persistent(self) -> bool:
+        return self.conn is not None
+
+    def get(self, path: str, version: Optional[str] = None, content: bool = True) -> Optional[Dict]:
+        """
+        Cached note data, or None.
+
+        Args:
+            path: Vault path of the note
+            version: The note's current "size:mtime", if known. A memory entry
+                with another version is stale; the persistent layer is only
+                consulted when the version is known
+            content: Whether the body is needed
+        """
+        with self._lock:
+            note, from_disk = self._lookup(path, version, content)
+            if note is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += from_disk
+            return self._view(note, content)
+
+    def _lookup(self, path: str, version: Optional[str], content: bool) -> Tuple[Optional[Dict], bool]:
+        entry = self.entries.get(path)
+        if entry is not None and (version is None or entry[0] == version) and (entry[2] or not content):
+            self.entries.move_to_end(path)
+            return entry[1], False
+
+        if self.conn is not None and version is not None:
+            row = self.conn.execute('SELECT version, has_content, data FROM notes WHERE path = ?',
+                                    (path,)).fetchone()
+            if row and row[0] == version and (row[1] or not content):
+                note = json.loads(row[2])
+                self._remember(path, version, note, bool(row[1]), len(row[2]))
+                return note, True
+        return None, False
+
+    def put(self, path: str, note: Dict, has_content: bool = True):
+        """Cache a note as fetched (its version is read from its stat)"""
+        version = note_version(note)
+        data = json.dumps(note, default=str)
+        with self._lock:
+            entry = self.entries.get(path)
+            # Don't replace a full entry for the same version with a metadata-only one
+            if entry is not None and entry[2] and not has_content and entry[0] == version:
+                return
+            self._remember(path, version, note, has_content, len(data))
+            # Only full notes are stored: metadata alone is cheaper to fetch again than to validate
+            if self.conn is not None and version is not None and has_content:
+                self.conn.execute('INSERT OR REPLACE INTO notes (path, version, has_content, data) VALUES (?, ?, ?, ?)',
+                                  (path, version, int(has_content), data))
+                self._pending += 1
+                if self._pending >= COMMIT_EVERY:
+                    self.flush()
+
+    def _remember(self, path: str, version: Optional[str], note: Dict, has_content: bool, size: int):
+        old = self.entries.pop(path, None)
+        if old is not None:
+            self.size -= old[3]
+        if size > self.max_bytes:
+            return
+        self.entries[path] = (version, note, has_content, size)
+        self.size += size
+        while self.size > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= evicted[3]
+
+    @staticmethod
+    def _view(note: Dict, content: bool) -> Dict:
+        if content or 'content' not in note:
+            return dict(note)
+        return {key: value for key, value in note.items() if key != 'content'}
+
+    def flush(self):
+        with self._lock:
+            if self.conn is not None and self._pending:
+                try:
+                    self.conn.commit()
+                except sqlite3.Error:
+                    pass
+                self._pending = 0
+
+    def stats(self) -> str:
+        lookups = self.hits + self.misses
+        rate = f" ({100 * self.hits / lookups:.0f}% hit rate)" if lookups else ""
+        disk = f", {self.disk_hits} from disk" if self.persistent else ""
+        return (f"Note cache: {self.hits} hits{disk}, {self.misses} misses{rate}; "
+                f"{len(self.entries)} notes, {self.size / 1024 / 1024:.1f} of {self.max_bytes / 1024 / 1024:.0f} MB")
+
+    def close(self):
+        self.flush()
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
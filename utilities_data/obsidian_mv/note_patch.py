@@ -0,0 +1,178 @@
+"""
+Turn a full rewrite of a note into targeted PATCH operations.
+
+The Local REST API can replace the content of one heading's section
+(PATCH /vault/{file} with Operation: replace, Target-Type: heading). A
+section runs from the line after the heading to the next heading of the
+same or a higher level, so it includes its subsections; the target is the
+heading's path from the top level, joined with '::'.
+
+plan_patches() diffs the old and new text by line, maps every changed
+region to the smallest section that contains it, and returns one
+(target, new section content) pair per section. It gives up (returns None,
+meaning: send the whole note with PUT) whenever the mapping could be
+ambiguous or isn't worth it:
+    - a change outside any section (frontmatter, text before the first
+      heading, a top-level heading line)
+    - headings the server might read differently from us (setext headings,
+      headings in block quotes or lists, duplicate heading paths, '::' in
+      heading text)
+    - more than MAX_PATCHES sections, or patches adding up to more than
+      MAX_PATCH_FRACTION of the note
+The result is checked by applying it to the old text, which must give the
+new text exactly.
+"""
+
+import difflib
+import re
+from typing import List, NamedTuple, Optional, Tuple
+
+# Above this many sections one PUT is cheaper than the round trips
+MAX_PATCHES = 3
+# Patches must be smaller than this share of the full note to be worth it
+MAX_PATCH_FRACTION = 0.5
+
+ATX_HEADING = re.compile(r'^ {0,3}(#{1,6})(?:[ \t]+(.*?))?[ \t]*$')
+CLOSING_HASHES = re.compile(r'(?:^|[ \t]+)#+$')
+FENCE = re.compile(r'^ {0,3}(`{3,}|~{3,})')
+SETEXT_UNDERLINE = re.compile(r'^ {0,3}(=+|-+)[ \t]*$')
+NESTED_HEADING = re.compile(r'^[ \t]*(?:(?:>[ \t]*)+|(?:[-*+]|\d+[.)])[ \t]+)#{1,6}(?:[ \t]|$)')
+
+
+class Section(NamedTuple):
+    target: str
+    level: int
+    start: int  # first character after the heading line
+    end: int  # start of the next heading at the same or a higher level (or end of note)
+
+
+def line_offsets(lines: List[str]) -> List[int]:
+    offsets = [0]
+    for line in lines:
+        offsets.append(offsets[-1] + len(line))
+    return offsets
+
+
+def parse_sections(content: str) -> Optional[List[Section]]:
+    """Heading sections of a note, or None if its headings can't be mapped unambiguously"""
+    lines = content.splitlines(keepends=True)
+    offsets = line_offsets(lines)
+
+    headings = []  # (level, text, line index)
+    fence = None
+    previous_blank = True
+    for index, line in enumerate(lines):
+        text = line.rstrip('\r\n')
+        # YAML frontmatter is not part of any section
+        if index == 0 and text == '---':
+            fence = '---'
+            continue
+        if fence == '---':
+            if text in ('---', '...'):
+                fence = None
+            continue
+
+        opening = FENCE.match(text)
+        if fence:
+            if opening and opening.group(1)[0] == fence[0] and len(opening.group(1)) >= len(fence):
+                fence = None
+            previous_blank = False
+            continue
+        if opening:
+            fence = opening.group(1)
+            previous_blank = False
+            continue
+
+        if not previous_blank and SETEXT_UNDERLINE.match(text):
+            return None
+        if NESTED_HEADING.match(text):
+            return None
+        match = ATX_HEADING.match(text)
+        if match:
+            heading_text = CLOSING_HASHES.sub('', match.group(2) or '').strip()
+            if '::' in heading_text:
+                return None
+            headings.append((len(match.group(1)), heading_text, index))
+        previous_blank = not text.strip()
+
+    sections = []
+    path = []  # (level, text) of the enclosing headings
+    for position, (level, text, index) in enumerate(headings):
+        while path and path[-1][0] >= level:
+            path.pop()
+        path.append((level, text))
+        end = len(content)
+        for next_level, _, next_index in headings[position + 1:]:
+            if next_level <= level:
+                end = offsets[next_index]
+                break
+        sections.append(Section('::'.join(t for _, t in path), level, offsets[index + 1], end))
+
+    targets = [section.target for section in sections]
+    if len(set(targets)) != len(targets):
+        return None
+    return sections
+
+
+def changed_regions(old: str, new: str) -> List[Tuple[int, int, int, int]]:
+    """(old start, old end, new start, new end) of every changed run of lines"""
+    old_lines = old.splitlines(keepends=True)
+    new_lines = new.splitlines(keepends=True)
+    old_offsets = line_offsets(old_lines)
+    new_offsets = line_offsets(new_lines)
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    return [(old_offsets[i1], old_offsets[i2], new_offsets[j1], new_offsets[j2])
+            for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != 'equal']
+
+
+def plan_patches(old: str, new: str) -> Optional[List[Tuple[str, str]]]:
+    """
+    Heading replacements that turn old into new.
+
+    Returns:
+        [(heading target, new section content), ...], or None if the note
+        should be written whole
+    """
+    if old == new:
+        return []
+    sections = parse_sections(old)
+    if not sections:
+        return None
+    regions = changed_regions(old, new)
+
+    # The deepest section holding each change; an enclosing section also covers its subsections
+    chosen = set()
+    for old_start, old_end, _, _ in regions:
+        holders = [i for i, s in enumerate(sections) if s.start <= old_start and old_end <= s.end]
+        if not holders:
+            return None
+        chosen.add(max(holders, key=lambda i: sections[i].level))
+    chosen = [i for i in chosen
+              if not any(j != i and sections[j].start <= sections[i].start and sections[i].end <= sections[j].end
+                         and sections[j].level < sections[i].level for j in chosen)]
+    if len(chosen) > MAX_PATCHES:
+        return None
+
+    patches = []
+    for i in sorted(chosen, key=lambda i: sections[i].start):
+        section = sections[i]
+        # Shift the section's bounds by the size changes of the edits before them
+        shift_start = sum((ne - ns) - (oe - os) for os, oe, ns, ne in regions if oe <= section.start and os < section.start)
+        shift_end = sum((ne - ns) - (oe - os) for os, oe, ns, ne in regions if oe <= section.end)
+        patches.append((section, new[section.start + shift_start:section.end + shift_end]))
+
+    size = sum(len(body.encode('utf-8')) for _, body in patches)
+    if size > MAX_PATCH_FRACTION * len(new.encode('utf-8')):
+        return None
+
+    # Apply the plan to the old text; anything but an exact match means writing the note whole
+    rebuilt = []
+    position = 0
+    for section, body in patches:
+        rebuilt.append(old[position:section.start])
+        rebuilt.append(body)
+        position = section.end
+    rebuilt.append(old[position:])
+    if ''.join(rebuilt) != new:
+        return None
+    return [(section.target, body) for section, body in patches]
@@ -5,50 +5,136 @@ Provides a unified interface for all Obsidian vault operations.
 """
 
 import requests
+import hashlib
 import json
-import re
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
 from urllib.parse import quote
-from typing import List, Dict, Tuple, Optional
+from typing import Any, Callable, Iterable, Iterator, List, Dict, Tuple, Optional
+
+from backlink_index import BacklinkIndex
+from link_rewriter import LinkRewriter, Rename, iter_links
+from note_patch import plan_patches
+from request_trace import NULL_TRACER
 
 # Suppress SSL warnings
 import urllib3
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+# Connection defaults, each overridable in settings.json
+DEFAULT_HTTP_POOL_SIZE = 16
+DEFAULT_HTTP_MAX_RETRIES = 3
+DEFAULT_HTTP_BACKOFF_FACTOR = 0.3
+DEFAULT_HTTP_TIMEOUT = 10
+DEFAULT_MAX_CONCURRENT_REQUESTS = 8
+
+# Persistent caches (vault listing, ...) live here unless settings.json says otherwise
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "obsidian-utilities"
+VAULT_LISTING_CACHE_FILE = "vault_listing.json"
+
+# Transient statuses worth retrying (Obsidian busy, proxy hiccups)
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def content_hash(content: str) -> str:
+    """SHA-256 of a note's text as stored (UTF-8)"""
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
 
 class ObsidianAPI:
     """
     Unified API client for Obsidian Local REST API operations.
     Handles authentication, HTTP requests, and common vault operations.
+
+    All requests go through one keep-alive session with a connection pool,
+    so repeated calls reuse the same TLS connection. Idempotent requests are
+    retried with exponential backoff on connection errors and transient
+    statuses. Batch helpers fan requests out over a bounded thread pool.
     """
 
-    def __init__(self, api_base_url: str = None, api_key_file: str = ".env"):
+    def __init__(self, api_base_url: str = None, api_key_file: str = ".env",
+                 pool_size: int = None, max_retries: int = None, backoff_factor: float = None,
+                 timeout: float = None, max_workers: int = None):
         """
         Initialize the API client.
 
         Args:
             api_base_url: Base URL for the Obsidian REST API (if None, loads from settings.json)
             api_key_file: Path to file containing API key
+            pool_size: Connections kept open in the pool (default: http_pool_size setting)
+            max_retries: Retries for idempotent requests (default: http_max_retries setting)
+            backoff_factor: Exponential backoff factor between retries (default: http_backoff_factor setting)
+            timeout: Default per-request timeout in seconds (default: http_timeout setting)
+            max_workers: Concurrency limit for batch calls (default: max_concurrent_requests setting)
         """
         self.api_key_file = api_key_file
+        self.settings = self._load_settings()
         self.api_base_url = api_base_url or self._load_api_base_url()
         self.api_key = self._load_api_key()
 
-    def _load_api_base_url(self) -> str:
-        """Load API base URL from settings.json."""
+        self.pool_size = pool_size or self.settings.get('http_pool_size', DEFAULT_HTTP_POOL_SIZE)
+        self.max_retries = max_retries if max_retries is not None else \
+            self.settings.get('http_max_retries', DEFAULT_HTTP_MAX_RETRIES)
+        self.backoff_factor = backoff_factor if backoff_factor is not None else \
+            self.settings.get('http_backoff_factor', DEFAULT_HTTP_BACKOFF_FACTOR)
+        self.timeout = timeout or self.settings.get('http_timeout', DEFAULT_HTTP_TIMEOUT)
+        self.max_workers = max_workers or self.settings.get('max_concurrent_requests',
+                                                            DEFAULT_MAX_CONCURRENT_REQUESTS)
+        self.session = self._create_session()
+        self._vault_files = None
+        self._backlinks = None
+        self._backlinks_fresh = False
+        self._backlinks_lock = threading.Lock()
+        # Swapped for a request_trace.Tracer by --trace
+        self.tracer = NULL_TRACER
+        # path -> (content hash, "size:mtime") as of the last read, to detect edits made since
+        self._read_states: Dict[str, Tuple[str, Optional[str]]] = {}
+        # path -> content expected after a PATCH, until verify_patches() has checked it
+        self._patched: Dict[str, str] = {}
+
+    def _load_settings(self) -> Dict:
+        """Load settings.json (shared with obsidian_mv and the mv wrapper)."""
         settings_path = Path(__file__).parent / "settings.json"
         try:
             with open(settings_path, 'r') as f:
-                settings = json.load(f)
-                api_url = settings.get("api_base_url")
-                if not api_url:
-                    raise ValueError("api_base_url not found in settings.json")
-                return api_url
+                return json.load(f)
         except FileNotFoundError:
             raise FileNotFoundError(f"{settings_path} not found")
         except json.JSONDecodeError:
             raise ValueError(f"Invalid JSON in {settings_path}")
 
+    def _load_api_base_url(self) -> str:
+        """Load API base URL from settings.json."""
+        api_url = self.settings.get("api_base_url")
+        if not api_url:
+            raise ValueError("api_base_url not found in settings.json")
+        return api_url
+
+    def _create_session(self) -> requests.Session:
+        """Build the keep-alive session with pooled, retrying adapters."""
+        retry = Retry(
+            total=self.max_retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=retry)
+
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.verify = False
+        session.headers['Authorization'] = f'Bearer {self.api_key}'
+        return session
+
     def _load_api_key(self) -> str:
         """Load API key from environment file."""
         try:
@@ -64,43 +150,299 @@ class ObsidianAPI:
             raise FileNotFoundError(f"{self.api_key_file} file not found")
 
     def make_request(self, endpoint: str, method: str = "GET", headers: Dict = None,
-                     params: Dict = None, data: str = None) -> Optional[requests.Response]:
+                     params: Dict = None, data: str = None,
+                     timeout: float = None) -> Optional[requests.Response]:
         """
         Make a generic HTTP request to the Obsidian API.
 
         Args:
             endpoint: API endpoint path (e.g., "/vault/file.md")
-            method: HTTP method (GET, POST, PUT, DELETE)
-            headers: Optional additional headers (auth and basic headers added automatically)
+            method: HTTP method (GET, POST, PUT, PATCH, DELETE)
+            headers: Optional additional headers (auth header is set on the session)
             params: Optional query parameters
             data: Optional request body data
+            timeout: Seconds to wait for this call (default: the client's timeout)
 
         Returns:
             Response object, or None if request fails
         """
         url = f"{self.api_base_url}{endpoint}"
+        body = data.encode('utf-8') if data else None
 
-        # Build headers with authentication
-        request_headers = {
-            'Authorization': f'Bearer {self.api_key}'
-        }
-        if headers:
-            request_headers.update(headers)
-
+        start = time.perf_counter()
         try:
-            response = requests.request(
+            response = self.session.request(
                 method=method,
                 url=url,
-                headers=request_headers,
+                headers=headers,
                 params=params,
-                data=data.encode('utf-8') if data else None,
-                verify=False,
-                timeout=10
+                data=body,
+                timeout=timeout or self.timeout
             )
-            return response
-        except requests.exceptions.RequestException:
+        except requests.exceptions.RequestException as e:
+            if self.tracer.enabled:
+                self.tracer.record_request(method, endpoint, start, time.perf_counter() - start, None,
+                                           len(body or b''), 0, 0, type(e).__name__)
             return None
 
+        if self.tracer.enabled:
+            retries = getattr(response.raw, 'retries', None)
+            self.tracer.record_request(method, endpoint, start, time.perf_counter() - start, response.status_code,
+                                       len(body or b''), len(response.content),
+                                       len(retries.history) if retries is not None else 0)
+        return response
+
+    def map_concurrent(self, func: Callable[[Any], Any], items: Iterable[Any],
+                       max_workers: int = None) -> List[Any]:
+        """
+        Call func on every item using a bounded thread pool.
+
+        Args:
+            func: Function to call for each item (typically one API call)
+            items: Items to process
+            max_workers: Concurrency limit (default: the client's max_workers)
+
+        Returns:
+            Results in the same order as items
+        """
+        items = list(items)
+        workers = min(max_workers or self.max_workers, len(items))
+        if workers <= 1:
+            return [func(item) for item in items]
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(func, items))
+
+    def imap_concurrent(self, func: Callable[[Any], Any], items: Iterable[Any],
+                        max_workers: int = None) -> Iterator[Any]:
+        """
+        Like map_concurrent, but yield each result as soon as it (and every
+        result before it) is ready.
+
+        Only about two calls per worker are in flight at a time, so results
+        reach the caller while later items are still being fetched and a slow
+        consumer doesn't make results pile up in memory.
+
+        Args:
+            func: Function to call for each item (typically one API call)
+            items: Items to process (may be a generator)
+            max_workers: Concurrency limit (default: the client's max_workers)
+        """
+        workers = max_workers or self.max_workers
+        if workers <= 1:
+            for item in items:
+                yield func(item)
+            return
+
+        items = iter(items)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = deque()
+            try:
+                for item in items:
+                    pending.append(executor.submit(func, item))
+                    if len(pending) >= workers * 2:
+                        yield pending.popleft().result()
+                while pending:
+                    yield pending.popleft().result()
+            finally:
+                # Stopped early (e.g. output closed): don't start what's still queued
+                for future in pending:
+                    future.cancel()
+
+    def get_many_file_contents(self, filepaths: Iterable[str],
+                               max_workers: int = None) -> Dict[str, Optional[str]]:
+        """
+        Get the content of many files concurrently.
+
+        Args:
+            filepaths: Paths relative to vault root
+            max_workers: Concurrency limit (default: the client's max_workers)
+
+        Returns:
+            Dict mapping each path to its content, or None if it couldn't be read
+        """
+        filepaths = list(filepaths)
+        contents = self.map_concurrent(self.get_file_content, filepaths, max_workers)
+        return dict(zip(filepaths, contents))
+
+    def get_cache_dir(self) -> Path:
+        """Directory for persistent caches (cache_dir setting, default ~/.cache/obsidian-utilities)."""
+        cache_dir = self.settings.get('cache_dir')
+        return Path(cache_dir).expanduser() if cache_dir else DEFAULT_CACHE_DIR
+
+    def get_local_vault_root(self) -> Optional[Path]:
+        """
+        Return vault_root from settings.json if the vault is readable on this machine.
+
+        Local access can be turned off with "local_vault_access": false, e.g. when
+        vault_root points at a synced copy that may lag behind Obsidian.
+        """
+        if not self.settings.get('local_vault_access', True):
+            return None
+        vault_root = self.settings.get('vault_root')
+        if vault_root and os.path.isdir(vault_root):
+            return Path(vault_root)
+        return None
+
+    def list_vault_files(self, refresh: bool = False) -> List[str]:
+        """
+        List every file in the vault, relative to the vault root.
+
+        Reads the filesystem directly when vault_root is available locally,
+        otherwise crawls /vault/ directories concurrently. The result is kept
+        for the life of the client and, for API crawls, optionally on disk for
+        vault_listing_ttl seconds. Writes through this client invalidate both.
+
+        Args:
+            refresh: Ignore cached listings and list the vault again
+
+        Returns:
+            File paths in depth-first order, as the recursive /vault/ walk returns them
+        """
+        if self._vault_files is not None and not refresh:
+            return self._vault_files
+
+        local_root = self.get_local_vault_root()
+        if local_root is not None:
+            with self.tracer.span('list_local_vault_files') as span:
+                self._vault_files = self._list_local_vault_files(local_root)
+                span['files'] = len(self._vault_files)
+            return self._vault_files
+
+        ttl = self.settings.get('vault_listing_ttl', 0)
+        cache_path = self.get_cache_dir() / VAULT_LISTING_CACHE_FILE
+        if ttl > 0 and not refresh:
+            cached = self._read_listing_cache(cache_path, ttl)
+            if cached is not None:
+                self._vault_files = cached
+                return cached
+
+        with self.tracer.span('crawl_vault_files') as span:
+            self._vault_files = self._crawl_vault_files()
+            span['files'] = len(self._vault_files)
+        if ttl > 0:
+            self._write_listing_cache(cache_path, self._vault_files)
+        return self._vault_files
+
+    def invalidate_vault_listing(self):
+        """Forget cached listings after the vault has been changed."""
+        self._vault_files = None
+        try:
+            (self.get_cache_dir() / VAULT_LISTING_CACHE_FILE).unlink()
+        except OSError:
+            pass
+
+    def forget_vault_state(self):
+        """
+        Drop what this client remembers about the vault (listing, backlink index freshness).
+
+        On-disk caches are kept; long-lived clients (vaultd) call this when
+        the vault may have changed behind their back.
+        """
+        self._vault_files = None
+        self._backlinks_fresh = False
+
+    def _list_local_vault_files(self, vault_root: Path) -> List[str]:
+        """Walk vault_root on disk, skipping hidden files and folders as Obsidian does."""
+        files = []
+        stack = [(str(vault_root), '')]
+        while stack:
+            directory, relative_dir = stack.pop()
+            try:
+                with os.scandir(directory) as it:
+                    entries = sorted(it, key=lambda entry: entry.name)
+            except OSError:
+                continue
+
+            # Files and folders are interleaved in listing order; a folder's
+            # contents come before the entries that follow it
+            subdirs = []
+            for entry in entries:
+                if entry.name.startswith('.'):
+                    continue
+                relative_path = f"{relative_dir}/{entry.name}" if relative_dir else entry.name
+                if entry.is_dir():
+                    subdirs.append((entry.path, relative_path))
+                else:
+                    files.append(relative_path)
+            stack.extend(reversed(subdirs))
+        return files
+
+    def _list_directory(self, path: str) -> List[str]:
+        """List one vault directory via the API ('' for the vault root)."""
+        endpoint = f"/vault/{quote(path, safe='')}/" if path else "/vault/"
+        response = self.make_request(endpoint, headers={'Accept': 'application/json'})
+        if response is None or response.status_code != 200:
+            return []
+        try:
+            return response.json().get('files', [])
+        except ValueError:
+            return []
+
+    def _crawl_vault_files(self) -> List[str]:
+        """
+        Crawl /vault/ breadth-first with up to max_workers directory requests in flight.
+
+        Listings are collected per directory and stitched back together in
+        depth-first order at the end, so the result doesn't depend on which
+        requests finish first.
+        """
+        listings = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = {executor.submit(self._list_directory, ''): ''}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path = pending.pop(future)
+                    items = future.result()
+                    listings[path] = items
+                    for item in items:
+                        if item.endswith('/'):
+                            subdir = f"{path}/{item.rstrip('/')}" if path else item.rstrip('/')
+                            pending[executor.submit(self._list_directory, subdir)] = subdir
+
+        files = []
+        stack = [iter(listings.get('', []))]
+        prefixes = ['']
+        while stack:
+            item = next(stack[-1], None)
+            if item is None:
+                stack.pop()
+                prefixes.pop()
+                continue
+            full_path = f"{prefixes[-1]}/{item}" if prefixes[-1] else item
+            if item.endswith('/'):
+                dir_path = full_path.rstrip('/')
+                stack.append(iter(listings.get(dir_path, [])))
+                prefixes.append(dir_path)
+            else:
+                files.append(full_path)
+        return files
+
+    def _read_listing_cache(self, cache_path: Path, ttl: float) -> Optional[List[str]]:
+        """Return the on-disk listing if it belongs to this vault and is younger than ttl."""
+        try:
+            with open(cache_path, 'r') as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if cached.get('api_base_url') != self.api_base_url:
+            return None
+        if time.time() - cached.get('created', 0) > ttl:
+            return None
+        return cached.get('files')
+
+    def _write_listing_cache(self, cache_path: Path, files: List[str]):
+        """Best-effort write of the listing cache; failures only cost a re-crawl."""
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = cache_path.with_suffix('.tmp')
+            with open(tmp_path, 'w') as f:
+                json.dump({'api_base_url': self.api_base_url, 'created': time.time(), 'files': files}, f)
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            pass
+
     def get_file_content(self, filepath: str) -> Optional[str]:
         """
         Get the content of a file via REST API.
@@ -118,22 +460,137 @@ class ObsidianAPI:
 
         if response and response.status_code == 200:
             data = response.json()
-            return data.get('content', '')
+            content = data.get('content', '')
+            stat = data.get('stat') or {}
+            version = f"{stat['size']}:{stat['mtime']}" if 'size' in stat and 'mtime' in stat else None
+            self._read_states[filepath] = (content_hash(content), version)
+            return content
+        else:
+            return None
+
+    def changed_since_read(self, filepaths: Iterable[str]) -> Optional[List[str]]:
+        """
+        Which of these notes changed since this client last read them.
+
+        With a local vault each file is hashed and compared with the content
+        that was read; otherwise one JsonLogic search fetches the notes' size
+        and mtime for comparison with what Obsidian reported at read time.
+        Notes without a reported version, or all of them if the search
+        fails, are fetched again and compared by content hash.
+        Notes this client never read are not checked.
+
+        Returns:
+            Changed (or deleted) paths, or None if the server couldn't say
+            for some of them
+        """
+        filepaths = [path for path in filepaths if path in self._read_states]
+        local_root = self.get_local_vault_root()
+        if local_root is not None:
+            changed = []
+            for path in filepaths:
+                try:
+                    current = hashlib.sha256((local_root / path).read_bytes()).hexdigest()
+                except OSError:
+                    current = None
+                if current != self._read_states[path][0]:
+                    changed.append(path)
+            return changed
+
+        versioned = [path for path in filepaths if self._read_states[path][1] is not None]
+        versions = self.note_versions(versioned) if versioned else {}
+        changed = []
+        if versions is None:
+            unknown = filepaths
         else:
+            changed = [path for path in versioned if versions.get(path) != self._read_states[path][1]]
+            unknown = [path for path in filepaths if self._read_states[path][1] is None]
+
+        for path, (answered, content) in zip(unknown, self.map_concurrent(self._fetch_current, unknown)):
+            if not answered:
+                return None
+            if content is None or content_hash(content) != self._read_states[path][0]:
+                changed.append(path)
+        return changed
+
+    def _fetch_current(self, filepath: str) -> Tuple[bool, Optional[str]]:
+        """
+        (answered, content) for a note as it is now, without recording it as read.
+
+        answered is False when the server couldn't be asked; content is None
+        if the note doesn't exist.
+        """
+        headers = {'Accept': 'application/vnd.olrapi.note+json'}
+        response = self.make_request(f"/vault/{quote(filepath, safe='/')}", headers=headers)
+        if response is None:
+            return False, None
+        if response.status_code == 404:
+            return True, None
+        if response.status_code != 200:
+            return False, None
+        try:
+            return True, response.json().get('content', '')
+        except ValueError:
+            return False, None
+
+    def note_contents(self, filepaths: List[str]) -> Optional[Dict[str, Optional[str]]]:
+        """
+        Current content of the given notes (None for missing ones).
+
+        One JsonLogic search returns them all; if the server can't run it,
+        each note is fetched. Returns None if some note couldn't be fetched.
+        """
+        results = self.search_jsonlogic({"if": [{"in": [{"var": "path"}, filepaths]}, {"var": "content"}, False]})
+        if results is not None:
+            contents = dict.fromkeys(filepaths)
+            for hit in results:
+                if isinstance(hit.get('result'), str):
+                    contents[hit['filename']] = hit['result']
+            return contents
+        fetched = self.map_concurrent(self._fetch_current, filepaths)
+        if not all(answered for answered, _ in fetched):
             return None
+        return {path: content for path, (_, content) in zip(filepaths, fetched)}
 
-    def update_file_content(self, filepath: str, content: str) -> bool:
+    def note_versions(self, filepaths: List[str]) -> Optional[Dict[str, str]]:
+        """Version ("size:mtime") of the given notes as Obsidian reports them, in one search"""
+        results = self.search_jsonlogic({"if": [{"in": [{"var": "path"}, filepaths]},
+                                                [{"var": "stat.size"}, {"var": "stat.mtime"}], False]})
+        if results is None:
+            return None
+        versions = {}
+        for hit in results:
+            values = hit.get('result')
+            if isinstance(values, list) and len(values) == 2:
+                versions[hit['filename']] = f"{values[0]}:{values[1]}"
+        return versions
+
+    def update_file_content(self, filepath: str, content: str, original: str = None) -> bool:
         """
-        Update the content of a file via REST API using PUT.
+        Update the content of a file via REST API.
+
+        When the current content is given and only a few heading sections
+        change, just those sections are sent with PATCH (see note_patch);
+        otherwise, or if a PATCH fails, the whole file is sent with PUT.
+        Patched notes are checked later by verify_patches().
 
         Args:
             filepath: Path to the file relative to vault root
             content: New content for the file
+            original: Content the file has now, if known (enables PATCH)
 
         Returns:
             True if successful, False otherwise
         """
         encoded_path = quote(filepath, safe='/')
+
+        if original is not None and self.settings.get('patch_updates', True):
+            patches = plan_patches(original, content)
+            if patches and all(self._patch_section(encoded_path, target, body) for target, body in patches):
+                self._patched[filepath] = content
+                self._backlinks_fresh = False
+                return True
+
+        self._patched.pop(filepath, None)
         headers = {'Content-Type': 'text/markdown'}
 
         response = self.make_request(
@@ -143,8 +600,57 @@ class ObsidianAPI:
             data=content
         )
 
+        # PUT may have created a new file
+        self.invalidate_vault_listing()
+        self._backlinks_fresh = False
         return response is not None and response.status_code in [200, 204]
 
+    def _patch_section(self, encoded_path: str, target: str, body: str) -> bool:
+        """Replace the content under one heading (target is its '::'-joined path)"""
+        headers = {
+            'Content-Type': 'text/markdown',
+            'Operation': 'replace',
+            'Target-Type': 'heading',
+            # Header values must be ASCII; the API expects non-ASCII targets URL-encoded
+            'Target': target if target.isascii() else quote(target, safe='')
+        }
+        response = self.make_request(f"/vault/{encoded_path}", method="PATCH", headers=headers, data=body)
+        return response is not None and response.status_code in [200, 204]
+
+    def verify_patches(self) -> List[str]:
+        """
+        Check that every note written with PATCH now holds exactly the intended
+        content, and rewrite any that doesn't with PUT.
+
+        A local vault is read from disk; otherwise the patched notes' content
+        comes back in one search (see note_contents). A note that can't be
+        checked is rewritten.
+
+        Returns:
+            Paths that are still wrong because rewriting them failed
+        """
+        patched, self._patched = self._patched, {}
+        if not patched:
+            return []
+        local_root = self.get_local_vault_root()
+        if local_root is not None:
+            mismatched = []
+            for path, content in patched.items():
+                try:
+                    if (local_root / path).read_bytes() == content.encode('utf-8'):
+                        continue
+                except OSError:
+                    pass
+                mismatched.append(path)
+        else:
+            current = self.note_contents(list(patched))
+            if current is None:
+                mismatched = list(patched)
+            else:
+                mismatched = [path for path, content in patched.items() if current.get(path) != content]
+
+        return [path for path in mismatched if not self.update_file_content(path, patched[path])]
+
     def delete_file(self, filepath: str) -> bool:
         """
         Delete a file via REST API.
@@ -159,11 +665,40 @@ class ObsidianAPI:
 
         response = self.make_request(f"/vault/{encoded_path}", method="DELETE")
 
+        self.invalidate_vault_listing()
+        self._backlinks_fresh = False
         return response is not None and response.status_code in [200, 204]
 
+    def backlink_index(self) -> Optional[BacklinkIndex]:
+        """
+        Return the backlink index, refreshed against the vault, or None if it can't be used.
+
+        The index is refreshed once per client and again after any write made
+        through it. It is disabled with "backlink_index": false, and unavailable
+        when the server can't report note versions (callers then fall back to
+        Dataview queries).
+        """
+        if not self.settings.get('backlink_index', True):
+            return None
+        with self._backlinks_lock:
+            if self._backlinks is None:
+                try:
+                    self._backlinks = BacklinkIndex(self)
+                except (OSError, sqlite3.Error):
+                    self.settings['backlink_index'] = False
+                    return None
+            if not self._backlinks_fresh:
+                if self._backlinks.refresh() is None:
+                    return None
+                self._backlinks_fresh = True
+            return self._backlinks
+
     def find_references(self, filename: str) -> List[Dict[str, str]]:
         """
-        Find all files that reference the given filename using Dataview queries.
+        Find all files that reference the given filename.
+
+        Answers from the backlink index when it's available, otherwise with a
+        Dataview query.
 
         Args:
             filename: Name of the file to search references for
@@ -171,6 +706,10 @@ class ObsidianAPI:
         Returns:
             List of dictionaries with 'filename' keys for files that reference the target
         """
+        index = self.backlink_index()
+        if index is not None:
+            return [{'filename': path} for path, _ in index.backlinks(filename)]
+
         # Remove .md extension if present for the search
         search_name = filename.replace('.md', '') if filename.endswith('.md') else filename
 
@@ -186,6 +725,28 @@ class ObsidianAPI:
         else:
             return []
 
+    def search_jsonlogic(self, logic: Dict) -> Optional[List[Dict]]:
+        """
+        Run a JsonLogic query against every note's metadata (path, frontmatter, tags, stat, content).
+
+        Args:
+            logic: JsonLogic expression; notes where it evaluates truthy are returned
+
+        Returns:
+            List of {'filename', 'result'} dictionaries, or None if the server
+            couldn't run the query (callers fall back to client-side filtering)
+        """
+        headers = {'Content-Type': 'application/vnd.olrapi.jsonlogic+json'}
+
+        response = self.make_request("/search/", method="POST", headers=headers, data=json.dumps(logic))
+
+        if response is not None and response.status_code == 200:
+            try:
+                return response.json()
+            except ValueError:
+                return None
+        return None
+
     def extract_link_references(self, content: str, target_note: str) -> List[str]:
         """
         Extract all [[...]] and ![[...]] references that point to the target note from content.
@@ -198,55 +759,7 @@ class ObsidianAPI:
         Returns:
             List of complete link strings that reference the target note
         """
-        # Remove .md extension from target if present
-        target_base = target_note.replace('.md', '') if target_note.endswith('.md') else target_note
-
-        # Find all [[...]] and ![[...]] links in the content
-        # Pattern captures: (optional !, complete match, inner content)
-        link_pattern = r'(!?\[\[([^\]]+)\]\])'
-        matches = []
-
-        for match in re.finditer(link_pattern, content):
-            full_match = match.group(1)  # The complete ![[...]] or [[...]]
-            link_inner = match.group(2)  # The text inside [[...]]
-
-            # Skip search helpers (they don't reference specific notes)
-            if link_inner.startswith('## ') or link_inner.startswith('^^ '):
-                continue
-
-            # Skip internal anchors (references within the same file)
-            if link_inner.startswith('#'):
-                continue
-
-            # Split link text and alias if present (e.g., [[link|alias]])
-            link_parts = link_inner.split('|')
-            link_target = link_parts[0].strip()
-
-            # Separate note name from anchor/heading/block references
-            # Handle patterns like: "Note name#Heading", "Note name#^block-id"
-            if '#' in link_target:
-                note_part = link_target.split('#')[0].strip()
-            else:
-                note_part = link_target
-
-            # Check if this link references our target
-            # It could be:
-            # - Exact match: [[popular note]] or [[popular note#Heading]]
-            # - With path: [[test/popular note]] or [[test/popular note#Heading]]
-            # - With leading slash: [[/test/popular note]]
-            # - With .md extension: [[popular note.md]]
-
-            # Normalize both for comparison
-            link_base = note_part.replace('.md', '') if note_part.endswith('.md') else note_part
-            link_base = link_base.lstrip('/')  # Remove leading slash
-
-            # Check if this references our target
-            if (link_base == target_base or
-                link_base.endswith('/' + target_base) or
-                target_base.endswith('/' + link_base)):
-                matches.append(full_match)
-
-        return matches
+        return LinkRewriter([(target_note, target_note)]).references(content)
 
     def extract_link_references_from_file(self, filepath: str, target_note: str) -> List[str]:
         """
@@ -265,19 +778,41 @@ class ObsidianAPI:
 
         return self.extract_link_references(content, target_note)
 
-    def rename_file(self, old_path: str, new_path: str) -> bool:
+    def rewrite_links(self, content: str, renames) -> Tuple[str, List[Dict[str, str]]]:
+        """
+        Rewrite every link in content that points at one of several renamed notes.
+
+        Each [[...]] link is matched against the renames in order and rewritten
+        at most once. Batches never move a note onto another source's path
+        (see plan_renames in obsidian_mv), so a rewritten link can't need a
+        second rename.
+
+        Args:
+            content: File content
+            renames: (old_name, new_name) pairs, or a LinkRewriter compiled from
+                them (compile once when rewriting many files)
+
+        Returns:
+            (new content, list of {'original', 'replacement'} changes)
+        """
+        rewriter = renames if isinstance(renames, LinkRewriter) else LinkRewriter(renames)
+        return rewriter.rewrite(content)
+
+    def rename_file(self, old_path: str, new_path: str, content: str = None) -> bool:
         """
         Rename/move a file by copying content and deleting original.
 
         Args:
             old_path: Current file path
             new_path: New file path
+            content: Content to write at new_path (default: the current content of old_path)
 
         Returns:
             True if successful, False otherwise
         """
         # Get the content of the old file
-        content = self.get_file_content(old_path)
+        if content is None:
+            content = self.get_file_content(old_path)
         if content is None:
             return False
 
@@ -306,70 +841,8 @@ class ObsidianAPI:
         Returns:
             Updated link text with new name
         """
-        # Remove .md extensions for comparison
-        old_base = old_name.replace('.md', '') if old_name.endswith('.md') else old_name
-        new_base = new_name.replace('.md', '') if new_name.endswith('.md') else new_name
-
-        # Get just the filename part without path for comparison
-        old_filename = old_base.split('/')[-1]
-        new_filename = new_base.split('/')[-1]
-
-        # Check if this is an embed link (starts with !)
-        is_embed = link_text.startswith('!')
-        embed_prefix = '!' if is_embed else ''
-
-        # Remove the embed prefix and [[ ]] from the link text
-        if is_embed:
-            link_inner = link_text[3:-2]  # Remove ![[...]]
-        else:
-            link_inner = link_text[2:-2]  # Remove [[...]]
-
-        # Split on pipe to handle aliases
-        parts = link_inner.split('|')
-        link_target = parts[0].strip()
-        alias = parts[1].strip() if len(parts) > 1 else None
-
-        # Separate note name from anchor/heading/block references
-        anchor = ''
-        if '#' in link_target:
-            note_and_anchor = link_target.split('#', 1)  # Split only on first #
-            note_target = note_and_anchor[0].strip()
-            anchor = '#' + note_and_anchor[1]  # Preserve the # and everything after
-        else:
-            note_target = link_target
-
-        # Handle different path formats for the note part only
-        new_target = note_target
-
-        # Direct match with full path
-        if note_target == old_base or note_target == old_name:
-            new_target = new_base
-        # With .md extension
-        elif note_target == f"{old_base}.md":
-            new_target = f"{new_base}.md"
-        # Just the filename (most common case)
-        elif note_target == old_filename:
-            new_target = new_filename
-        elif note_target == f"{old_filename}.md":
-            new_target = f"{new_filename}.md"
-        # Absolute path
-        elif note_target.startswith('/'):
-            if note_target == f"/{old_base}" or note_target == f"/{old_name}":
-                new_target = f"/{new_base}"
-            elif note_target == f"/{old_base}.md":
-                new_target = f"/{new_base}.md"
-        # Relative path - replace the last component
-        elif '/' in note_target:
-            path_parts = note_target.split('/')
-            last_part = path_parts[-1]
-            if last_part == old_filename or last_part == f"{old_filename}.md":
-                path_parts[-1] = new_filename if last_part == old_filename else f"{new_filename}.md"
-                new_target = '/'.join(path_parts)
-
-        # Reconstruct the full link with embed prefix, new target, anchor, and alias
-        full_target = new_target + anchor
-
-        if alias:
-            return f"{embed_prefix}[[{full_target}|{alias}]]"
-        else:
-            return f"{embed_prefix}[[{full_target}]]"
\ No newline at end of file
+        for link in iter_links(link_text):
+            note_target = link_text[link.target_start:link.target_end]
+            new_target = Rename(old_name, new_name).retarget(note_target)
+            return link_text[:link.target_start] + new_target + link_text[link.target_end:]
+        return link_text
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Query planner for obsidian_query.
+Compiles property and tag filters into a single JsonLogic search that Obsidian
+evaluates server-side, keeping client-side filtering only for predicates
+JsonLogic can't express with Python's comparison semantics.
+"""
+
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+# Note fields returned by the JsonLogic search for every match. Together they
+# cover everything format_results shows except the note body.
+PROJECTED_FIELDS = ('path', 'frontmatter', 'tags', 'stat')
+
+# Values JsonLogic's loose == compares differently from Python's str(value) == value
+# (YAML booleans/nulls, and dates, which Obsidian may hand to JsonLogic as Date objects)
+_UNPUSHABLE_VALUE = re.compile(
+    r'^(true|false|yes|no|on|off|null|none|~|\d{4}-\d{2}-\d{2}([ T].*)?)$',
+    re.IGNORECASE
+)
+
+
+def parse_property_filter(prop_filter: str) -> Optional[Tuple[str, str]]:
+    """
+    Split a KEY=VALUE filter, stripping whitespace and quotes around the value.
+
+    Returns:
+        (key, value), or None if the filter has no '='
+    """
+    if '=' not in prop_filter:
+        return None
+    key, value = prop_filter.split('=', 1)
+    return key.strip(), value.strip().strip('"\'')
+
+
+def frontmatter_matches(frontmatter: Dict[str, Any], filters: List[Tuple[str, str]]) -> bool:
+    """
+    Check parsed filters against a note's frontmatter.
+
+    A scalar matches when str(value) equals the filter value; a list matches
+    when any item does.
+    """
+    for key, value in filters:
+        if key not in frontmatter:
+            return False
+        fm_value = frontmatter[key]
+        if isinstance(fm_value, list):
+            if value not in [str(v) for v in fm_value]:
+                return False
+        elif str(fm_value) != value:
+            return False
+    return True
+
+
+def note_has_tag(note_tags: List[str], tag: str) -> bool:
+    """Whether a note's tags include tag or a nested tag below it, ignoring '#'."""
+    tag = tag.lstrip('#')
+    for note_tag in note_tags or []:
+        note_tag = str(note_tag).lstrip('#')
+        if note_tag == tag or note_tag.startswith(f"{tag}/"):
+            return True
+    return False
+
+
+def is_pushable(key: str, value: str) -> bool:
+    """
+    Whether JsonLogic equality on this filter agrees with the client-side check.
+
+    JsonLogic splits var names on '.', so a key like 'a.b' would be looked up
+    as frontmatter['a']['b'] rather than the property named 'a.b'.
+    """
+    return '.' not in key and not _UNPUSHABLE_VALUE.match(value)
+
+
+def _property_logic(key: str, value: str) -> Dict:
+    """frontmatter[key] == value, or value is an item of the frontmatter[key] list."""
+    field = {"var": f"frontmatter.{key}"}
+    # "some" throws on null in JsonLogic, so guard it with the field's truthiness
+    return {"or": [
+        {"==": [field, value]},
+        {"and": [field, {"some": [field, {"==": [{"var": ""}, value]}]}]}
+    ]}
+
+
+def _tag_logic(tag: str) -> Dict:
+    """The note has the tag, or a nested tag below it (tag/child), with or without '#'."""
+    tag = tag.lstrip('#')
+    item = {"var": ""}
+    return {"and": [{"var": "tags"}, {"some": [{"var": "tags"}, {"or": [
+        {"==": [item, tag]},
+        {"==": [item, f"#{tag}"]},
+        {"==": [{"substr": [item, 0, len(tag) + 1]}, f"{tag}/"]},
+        {"==": [{"substr": [item, 0, len(tag) + 2]}, f"#{tag}/"]}
+    ]}]}]}
+
+
+class QueryPlan:
+    """
+    A compiled obsidian_query search.
+
+    Attributes:
+        logic: JsonLogic expression returning the projected note fields for matches
+        pushed_filters: Property filters evaluated by Obsidian
+        residual_filters: Property filters that must be checked client-side
+        filters: Every parsed property filter (re-checked client-side on the
+            projected frontmatter, which costs nothing extra)
+    """
+
+    def __init__(self, property_filters: List[str] = None, tags: List[str] = None,
+                 paths: List[str] = None):
+        """
+        Args:
+            property_filters: KEY=VALUE filters (invalid entries are ignored)
+            tags: Tags every result must have
+            paths: Restrict results to these vault paths (e.g. text search hits)
+        """
+        self.filters = [f for f in (parse_property_filter(p) for p in property_filters or []) if f]
+        self.pushed_filters = [f for f in self.filters if is_pushable(*f)]
+        self.residual_filters = [f for f in self.filters if not is_pushable(*f)]
+        self.tags = tags or []
+        self.paths = paths
+        self.logic = self._compile()
+
+    def _compile(self) -> Dict:
+        conditions = [_property_logic(key, value) for key, value in self.pushed_filters]
+        conditions.extend(_tag_logic(tag) for tag in self.tags)
+        if self.paths is not None:
+            conditions.append({"in": [{"var": "path"}, list(self.paths)]})
+
+        projection = [{"var": field} for field in PROJECTED_FIELDS]
+        if not conditions:
+            return {"if": [True, projection, False]}
+        condition = conditions[0] if len(conditions) == 1 else {"and": conditions}
+        return {"if": [condition, projection, False]}
+
+    def build_results(self, search_results: List[Dict]) -> List[Dict]:
+        """
+        Turn JsonLogic search hits into partial note dicts and apply client-side filters.
+
+        Args:
+            search_results: Response from POST /search/ ([{filename, result}])
+
+        Returns:
+            Notes with path, frontmatter, tags and stat (no content)
+        """
+        notes = []
+        for hit in search_results:
+            values = hit.get('result')
+            if not isinstance(values, list) or len(values) != len(PROJECTED_FIELDS):
+                continue
+            note = dict(zip(PROJECTED_FIELDS, values))
+            note['path'] = note.get('path') or hit.get('filename', '')
+            note['frontmatter'] = note.get('frontmatter') or {}
+            note['tags'] = note.get('tags') or []
+            if frontmatter_matches(note['frontmatter'], self.filters):
+                notes.append(note)
+        return notes
+
+
+# Returns every note's frontmatter in one search (wrapped in a list so empty frontmatter is still truthy)
+ALL_FRONTMATTER_LOGIC = {"if": [True, [{"var": "frontmatter"}], False]}
+
+_DATE_VALUE = re.compile(r'^\d{4}-\d{2}-\d{2}([ T]\d{2}:\d{2}(:\d{2})?.*)?$')
+
+
+def value_type(value: Any) -> str:
+    """Name a frontmatter value's type the way Obsidian's property editor does."""
+    if isinstance(value, bool):
+        return 'checkbox'
+    if isinstance(value, (int, float)):
+        return 'number'
+    if isinstance(value, list):
+        return 'list'
+    if isinstance(value, dict):
+        return 'object'
+    if value is None:
+        return 'empty'
+    if isinstance(value, str) and _DATE_VALUE.match(value):
+        return 'date'
+    return 'text'
+
+
+def property_statistics(frontmatters: List[Dict[str, Any]], total_notes: int) -> List[Dict[str, Any]]:
+    """
+    Aggregate exact per-property statistics.
+
+    Args:
+        frontmatters: Frontmatter of every note (empty dicts for notes without any)
+        total_notes: Number of notes, for percent coverage
+
+    Returns:
+        One entry per property, most common first: name, count, coverage
+        (percent of notes), distinct (number of distinct values, list items
+        counted individually) and types ({type name: count})
+    """
+    counts = {}
+    distinct = {}
+    types = {}
+    for frontmatter in frontmatters:
+        for prop, value in frontmatter.items():
+            counts[prop] = counts.get(prop, 0) + 1
+            prop_types = types.setdefault(prop, {})
+            type_name = value_type(value)
+            prop_types[type_name] = prop_types.get(type_name, 0) + 1
+
+            values = distinct.setdefault(prop, set())
+            for item in (value if isinstance(value, list) else [value]):
+                # Nested lists/objects aren't hashable; compare them by content
+                values.add(item if isinstance(item, (str, int, float, bool, type(None)))
+                           else json.dumps(item, sort_keys=True, default=str))
+
+    stats = []
+    for prop, count in sorted(counts.items(), key=lambda x: (-x[1], x[0])):
+        stats.append({
+            'name': prop,
+            'count': count,
+            'coverage': round(100.0 * count / total_notes, 1) if total_notes else 0.0,
+            'distinct': len(distinct[prop]),
+            'types': dict(sorted(types[prop].items(), key=lambda x: -x[1]))
+        })
+    return stats
+
+
+def needs_content(output_format: str, fields: Optional[str]) -> bool:
+    """Whether formatting the results requires the full note (body included)."""
+    if output_format == 'count':
+        return False
+    if fields:
+        return 'content' in [f.strip() for f in fields.split(',')]
+    return output_format in ('json', 'ndjson')
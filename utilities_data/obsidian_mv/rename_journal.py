@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Rollback journal for obsidian_mv batch renames.
+Records the original content of every file before it is written so a batch
+that fails midway (or a crashed process) can be undone.
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from vault_storage import fsync_directory
+
+JOURNAL_DIR_NAME = "rename_journals"
+
+
+class RenameJournal:
+    """
+    Append-only JSON Lines journal of the writes made by one batch.
+
+    The first line describes the batch. Each write is recorded as a 'begin'
+    entry (with everything needed to undo it) before it is made and a 'done'
+    entry after it succeeds. The batch line and every 'begin' entry are
+    fsynced before the write they describe; a lost 'done' only means
+    rollback undoes a step that had finished, which is safe. Rollback
+    undoes every begun step, newest first, since a step without 'done' may
+    still have reached the server.
+
+    Step kinds:
+        update: {'path', 'original'} - a file rewritten in place
+        move:   {'old', 'new', 'original'} - a file written at 'new' and deleted at 'old'
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._next_step = 0
+
+    @classmethod
+    def create(cls, journal_dir: Path, pairs: List[List[str]]) -> 'RenameJournal':
+        """Start a new journal for a batch of (old, new) renames."""
+        journal_dir.mkdir(parents=True, exist_ok=True)
+        journal = cls(journal_dir / f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.jsonl")
+        journal._append({'type': 'batch', 'created': time.time(), 'pairs': pairs}, durable=True)
+        fsync_directory(journal_dir)
+        return journal
+
+    @classmethod
+    def latest(cls, journal_dir: Path) -> Optional['RenameJournal']:
+        """Return the most recent journal left behind in journal_dir, if any."""
+        journals = sorted(journal_dir.glob('*.jsonl')) if journal_dir.is_dir() else []
+        return cls(journals[-1]) if journals else None
+
+    def _append(self, entry: Dict, durable: bool = False):
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + '\n')
+                f.flush()
+                if durable:
+                    os.fsync(f.fileno())
+
+    def begin(self, step: Dict) -> int:
+        """Record a write that is about to happen; returns its step id."""
+        with self._lock:
+            step_id = self._next_step
+            self._next_step += 1
+        # Must reach the disk before the write it describes does
+        self._append({'type': 'begin', 'id': step_id, **step}, durable=True)
+        return step_id
+
+    def done(self, step_id: int):
+        """Record that a write completed."""
+        self._append({'type': 'done', 'id': step_id})
+
+    def begun_steps(self) -> List[Dict]:
+        """Every begun step in the order it was recorded (completed or not)."""
+        steps = []
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A crash can leave a truncated last line
+                    continue
+                if entry.get('type') == 'begin':
+                    steps.append(entry)
+        return steps
+
+    def discard(self):
+        """Delete the journal once the batch has fully succeeded or been rolled back."""
+        try:
+            self.path.unlink()
+        except OSError:
+            pass
@@ -0,0 +1,246 @@
+"""
+Request tracing and profiling for obsidian_mv and obsidian_query (--trace, --profile).
+
+A Tracer attached to ObsidianAPI records every make_request call (endpoint,
+method, status, latency, bytes each way, retries) and the local scans
+around them as spans. At the end of a run the spans are written as a
+Chrome trace (open in chrome://tracing or https://ui.perfetto.dev) and a
+per-endpoint summary with p50/p99 latencies is printed to stderr.
+"""
+
+import importlib.util
+import json
+import math
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterator, List, Optional
+from urllib.parse import unquote
+
+# Rows shown in the --profile report
+PROFILE_REPORT_ROWS = 25
+
+
+def endpoint_pattern(method: str, endpoint: str) -> str:
+    """Group requests by route: 'GET /vault/{file}', 'GET /vault/{dir}/', 'POST /search/', ..."""
+    path = endpoint.split('?', 1)[0]
+    if path.startswith('/vault/') and path != '/vault/':
+        path = '/vault/{dir}/' if path.endswith('/') else '/vault/{file}'
+    elif path.startswith('/periodic/'):
+        path = '/periodic/{period}/'
+    return f"{method} {path}"
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+
+class NullTracer:
+    """The tracer ObsidianAPI uses when tracing is off: records nothing"""
+
+    enabled = False
+
+    def span(self, name: str, category: str = 'local', **args):
+        return nullcontext(args)
+
+    def record_request(self, *args, **kwargs):
+        pass
+
+
+NULL_TRACER = NullTracer()
+
+
+class Tracer:
+    """
+    Collects spans from any thread.
+
+    Each span is a Chrome trace "complete" event; requests also feed the
+    per-endpoint statistics used by summary().
+    """
+
+    enabled = True
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.events: List[Dict] = []
+        self.threads: Dict[int, str] = {}
+        self.requests: Dict[str, Dict] = {}
+        self.lock = threading.Lock()
+
+    def _add(self, name: str, category: str, start: float, duration: float, args: Dict):
+        thread = threading.current_thread()
+        with self.lock:
+            self.threads.setdefault(thread.ident, thread.name)
+            self.events.append({
+                'name': name,
+                'cat': category,
+                'ph': 'X',
+                'ts': round((start - self.started) * 1e6, 1),
+                'dur': round(duration * 1e6, 1),
+                'pid': os.getpid(),
+                'tid': thread.ident,
+                'args': args
+            })
+
+    @contextmanager
+    def span(self, name: str, category: str = 'local', **args) -> Iterator[Dict]:
+        """
+        Time a block of work. Yields the span's args, so the block can add
+        results (e.g. how many files it found) before the span is recorded.
+        """
+        start = time.perf_counter()
+        try:
+            yield args
+        finally:
+            self._add(name, category, start, time.perf_counter() - start, args)
+
+    def record_request(self, method: str, endpoint: str, start: float, duration: float, status: Optional[int],
+                       bytes_sent: int, bytes_received: int, retries: int, error: Optional[str] = None):
+        """Record one make_request call (status None means no response)"""
+        pattern = endpoint_pattern(method, endpoint)
+        args = {'endpoint': unquote(endpoint), 'status': status, 'bytes_sent': bytes_sent,
+                'bytes_received': bytes_received, 'retries': retries}
+        if error:
+            args['error'] = error
+        self._add(pattern, 'request', start, duration, args)
+
+        with self.lock:
+            stats = self.requests.setdefault(pattern, {'latencies': [], 'errors': 0, 'retries': 0,
+                                                       'bytes_sent': 0, 'bytes_received': 0})
+            stats['latencies'].append(duration)
+            stats['retries'] += retries
+            stats['bytes_sent'] += bytes_sent
+            stats['bytes_received'] += bytes_received
+            if status is None or status >= 400:
+                stats['errors'] += 1
+
+    def summary(self) -> Dict:
+        """Per-endpoint request statistics and per-name totals for the other spans"""
+        with self.lock:
+            endpoints = {}
+            for pattern, stats in sorted(self.requests.items()):
+                latencies = sorted(stats['latencies'])
+                endpoints[pattern] = {
+                    'calls': len(latencies),
+                    'errors': stats['errors'],
+                    'retries': stats['retries'],
+                    'p50_ms': round(percentile(latencies, 0.5) * 1000, 2),
+                    'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+                    'total_ms': round(sum(latencies) * 1000, 2),
+                    'bytes_sent': stats['bytes_sent'],
+                    'bytes_received': stats['bytes_received']
+                }
+            spans = {}
+            for event in self.events:
+                if event['cat'] == 'request':
+                    continue
+                span = spans.setdefault(event['name'], {'calls': 0, 'total_ms': 0.0})
+                span['calls'] += 1
+                span['total_ms'] = round(span['total_ms'] + event['dur'] / 1000, 2)
+        return {
+            'wall_ms': round((time.perf_counter() - self.started) * 1000, 2),
+            'requests': sum(e['calls'] for e in endpoints.values()),
+            'endpoints': endpoints,
+            'spans': spans
+        }
+
+    def write_chrome_trace(self, path: str, summary: Dict):
+        """Write the spans in Chrome's trace event format, with the summary alongside"""
+        with self.lock:
+            metadata = [{'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': tid, 'args': {'name': name}}
+                        for tid, name in self.threads.items()]
+            events = metadata + sorted(self.events, key=lambda event: event['ts'])
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms', 'otherData': {'summary': summary}}, f)
+
+    def print_summary(self, summary: Dict, file=None):
+        file = file or sys.stderr
+        endpoints = summary['endpoints'].values()
+        received = sum(e['bytes_received'] for e in endpoints)
+        sent = sum(e['bytes_sent'] for e in endpoints)
+        print(f"\n🔬 Trace: {summary['requests']} requests in {summary['wall_ms'] / 1000:.2f}s "
+              f"({received / 1024:.1f} KB received, {sent / 1024:.1f} KB sent)", file=file)
+        if summary['endpoints']:
+            print(f"   {'Endpoint':<28} {'Calls':>6} {'Errors':>6} {'Retries':>7} {'p50 ms':>8} {'p99 ms':>8} "
+                  f"{'Total ms':>9} {'KB recv':>8}", file=file)
+            for pattern, stats in summary['endpoints'].items():
+                print(f"   {pattern:<28} {stats['calls']:>6} {stats['errors']:>6} {stats['retries']:>7} "
+                      f"{stats['p50_ms']:>8.1f} {stats['p99_ms']:>8.1f} {stats['total_ms']:>9.1f} "
+                      f"{stats['bytes_received'] / 1024:>8.1f}", file=file)
+        for name, span in summary['spans'].items():
+            print(f"   {name:<28} {span['calls']:>6} call(s) {span['total_ms']:>10.1f} ms", file=file)
+
+
+def pyinstrument_available() -> bool:
+    return importlib.util.find_spec('pyinstrument') is not None
+
+
+@contextmanager
+def profiled(path: Optional[str]):
+    """
+    Profile the block into path: pyinstrument's HTML report for .html files
+    (pyinstrument must be installed), cProfile stats otherwise. Both profile
+    the calling thread; requests made by worker threads show up in --trace.
+    """
+    if not path:
+        yield
+        return
+
+    if path.endswith('.html'):
+        from pyinstrument import Profiler
+        profiler = Profiler()
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(profiler.output_html())
+            print(f"Profile written to {path}", file=sys.stderr)
+        return
+
+    import cProfile
+    import pstats
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        print(f"\n⏱️  Profile written to {path} (top {PROFILE_REPORT_ROWS} by cumulative time):", file=sys.stderr)
+        pstats.Stats(profiler, stream=sys.stderr).sort_stats('cumulative').print_stats(PROFILE_REPORT_ROWS)
+
+
+@contextmanager
+def diagnostics(api, trace_file: Optional[str] = None, profile_file: Optional[str] = None):
+    """
+    Trace and/or profile everything done with api inside the block.
+
+    The tracer is detached again afterwards, so a client reused by vaultd
+    only traces the run that asked for it.
+    """
+    tracer = Tracer() if trace_file else None
+    if tracer:
+        api.tracer = tracer
+    try:
+        with profiled(profile_file):
+            yield tracer
+    finally:
+        if tracer:
+            api.tracer = NULL_TRACER
+            summary = tracer.summary()
+            written = True
+            try:
+                tracer.write_chrome_trace(trace_file, summary)
+            except OSError as e:
+                written = False
+                print(f"Warning: Could not write trace to {trace_file}: {e}", file=sys.stderr)
+            tracer.print_summary(summary)
+            if written:
+                print(f"   Trace written to {trace_file}", file=sys.stderr)
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Storage backends for obsidian_mv: where notes are read from and written to.
+RestStorage goes through the Local REST API and works wherever Obsidian is
+reachable. LocalStorage works on the files under vault_root directly:
+moves are a single os.rename, reads and writes are plain buffered file I/O
+spread over a small thread pool, and every write goes to a temporary file
+that atomically replaces the note, so a crash leaves either the old or the
+new version and never a partial one.
+"""
+
+import errno
+import hashlib
+import os
+import stat
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# Reads and writes in flight at once with LocalStorage
+DEFAULT_LOCAL_IO_WORKERS = 4
+
+# Files created by LocalStorage get the permissions open() would give them
+UMASK = os.umask(0)
+os.umask(UMASK)
+
+# Flags for the no-replace renames of Linux (renameat2) and macOS (renamex_np)
+AT_FDCWD = -100
+RENAME_NOREPLACE = 1
+RENAME_EXCL = 4
+
+
+class RestStorage:
+    """Notes read and written with the Local REST API (PUT/PATCH, copy-and-delete moves)"""
+
+    name = 'rest'
+    # Moves copy content through the API, which only handles text
+    moves_attachments = False
+
+    def __init__(self, api):
+        self.api = api
+
+    def describe(self) -> str:
+        return f"Local REST API at {self.api.api_base_url}"
+
+    def map(self, func: Callable[[Any], Any], items: Iterable[Any]) -> List[Any]:
+        return self.api.map_concurrent(func, items)
+
+    def read_many(self, paths: Iterable[str]) -> Dict[str, Optional[str]]:
+        return self.api.get_many_file_contents(paths)
+
+    def exists(self, path: str) -> bool:
+        return self.api.get_file_content(path) is not None
+
+    def changed_since_read(self, paths: Iterable[str]) -> Optional[List[str]]:
+        return self.api.changed_since_read(paths)
+
+    def write(self, path: str, content: str, original: str = None) -> bool:
+        return self.api.update_file_content(path, content, original=original)
+
+    def verify_writes(self) -> List[str]:
+        return self.api.verify_patches()
+
+    def move(self, old: str, new: str, content: str = None) -> bool:
+        return self.api.rename_file(old, new, content)
+
+    def delete(self, path: str) -> bool:
+        return self.api.delete_file(path)
+
+
+class LocalStorage:
+    """
+    Notes read and written directly under vault_root.
+
+    Text is decoded with surrogateescape, so a note that isn't valid UTF-8
+    is written back byte for byte. Obsidian notices the changes through its
+    file watcher like any other edit made outside the app.
+    """
+
+    name = 'local'
+    moves_attachments = True
+
+    def __init__(self, api, root: Path, max_workers: int = DEFAULT_LOCAL_IO_WORKERS):
+        self.api = api
+        self.root = Path(root)
+        self.max_workers = max_workers
+        # path -> SHA-256 of the bytes last read, to detect edits made since
+        self._read_hashes: Dict[str, str] = {}
+
+    def describe(self) -> str:
+        return f"files under {self.root}"
+
+    def map(self, func: Callable[[Any], Any], items: Iterable[Any]) -> List[Any]:
+        return self.api.map_concurrent(func, items, self.max_workers)
+
+    def read(self, path: str) -> Optional[str]:
+        try:
+            with open(self.root / path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        self._read_hashes[path] = hashlib.sha256(data).hexdigest()
+        return data.decode('utf-8', 'surrogateescape')
+
+    def read_many(self, paths: Iterable[str]) -> Dict[str, Optional[str]]:
+        paths = list(paths)
+        return dict(zip(paths, self.map(self.read, paths)))
+
+    def exists(self, path: str) -> bool:
+        return os.path.lexists(self.root / path)
+
+    def changed_since_read(self, paths: Iterable[str]) -> Optional[List[str]]:
+        changed = []
+        for path in paths:
+            if path not in self._read_hashes:
+                continue
+            try:
+                with open(self.root / path, 'rb') as f:
+                    current = hashlib.sha256(f.read()).hexdigest()
+            except OSError:
+                current = None
+            if current != self._read_hashes[path]:
+                changed.append(path)
+        return changed
+
+    def write(self, path: str, content: str, original: str = None) -> bool:
+        try:
+            atomic_write(self.root / path, content.encode('utf-8', 'surrogateescape'))
+        except OSError:
+            return False
+        finally:
+            self.api.forget_vault_state()
+        return True
+
+    def verify_writes(self) -> List[str]:
+        # Whole files replaced atomically; nothing can be half applied
+        return []
+
+    def move(self, old: str, new: str, content: str = None) -> bool:
+        """
+        Move a file with os.rename, after rewriting it in place if its content changes.
+
+        The note exists under exactly one of its names at any moment (or,
+        on filesystems without an atomic no-replace rename, briefly under
+        both); an interrupted move leaves it at the old path, possibly with
+        its links already rewritten (the rename journal restores the
+        original). A file already at the new path is never replaced.
+        """
+        old_path = self.root / old
+        new_path = self.root / new
+        if os.path.lexists(new_path):
+            return False
+        try:
+            if content is not None:
+                data = content.encode('utf-8', 'surrogateescape')
+                with open(old_path, 'rb') as f:
+                    if f.read() != data:
+                        atomic_write(old_path, data)
+            new_path.parent.mkdir(parents=True, exist_ok=True)
+            rename_noreplace(old_path, new_path)
+            fsync_directory(new_path.parent)
+            if new_path.parent != old_path.parent:
+                fsync_directory(old_path.parent)
+        except OSError:
+            return False
+        finally:
+            self.api.forget_vault_state()
+        return True
+
+    def delete(self, path: str) -> bool:
+        try:
+            os.remove(self.root / path)
+        except OSError:
+            return False
+        finally:
+            self.api.forget_vault_state()
+        return True
+
+
+def fsync_directory(directory: Path):
+    """Make a rename or new file in directory durable (a no-op where directories can't be opened)"""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+@lru_cache(maxsize=None)
+def _libc_rename_noreplace() -> Optional[Callable[[bytes, bytes], int]]:
+    """The platform's atomic no-replace rename as f(src, dst) -> 0 or -1 (errno set), if libc has one"""
+    try:
+        import ctypes
+        libc = ctypes.CDLL(None, use_errno=True)
+    except (ImportError, OSError):
+        return None
+    renameat2 = getattr(libc, 'renameat2', None)
+    if renameat2 is not None:
+        return lambda src, dst: renameat2(AT_FDCWD, src, AT_FDCWD, dst, RENAME_NOREPLACE)
+    renamex_np = getattr(libc, 'renamex_np', None)
+    if renamex_np is not None:
+        return lambda src, dst: renamex_np(src, dst, RENAME_EXCL)
+    return None
+
+
+def rename_noreplace(src: Path, dst: Path):
+    """
+    Rename src to dst, raising FileExistsError rather than replacing anything at dst.
+
+    The check and the rename are one atomic step: renameat2(RENAME_NOREPLACE)
+    or renamex_np(RENAME_EXCL) where the platform and filesystem support it,
+    else a hard link (which fails with EEXIST) followed by removing src.
+    On filesystems without hard links (FAT, some network mounts) dst is
+    claimed with O_EXCL first and the rename replaces only that placeholder.
+    """
+    rename = _libc_rename_noreplace()
+    if rename is not None:
+        import ctypes
+        if rename(os.fsencode(src), os.fsencode(dst)) == 0:
+            return
+        error = ctypes.get_errno()
+        if error not in (errno.EINVAL, errno.ENOSYS, errno.ENOTSUP, errno.EOPNOTSUPP):
+            raise OSError(error, os.strerror(error), str(src), None, str(dst))
+    try:
+        os.link(src, dst, follow_symlinks=False)
+    except FileExistsError:
+        raise
+    except OSError:
+        os.close(os.open(dst, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o600))
+        os.replace(src, dst)
+        return
+    os.unlink(src)
+
+
+def atomic_write(path: Path, data: bytes):
+    """
+    Replace path with data so that readers (and a crash) see either the old
+    file or the new one.
+
+    The data goes to a hidden temporary file in the same folder (Obsidian
+    ignores dotfiles), is flushed to disk, takes over the original's
+    permissions and is then renamed over the original.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", suffix='.tmp', dir=path.parent)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            mode = stat.S_IMODE(os.stat(path).st_mode)
+        except FileNotFoundError:
+            mode = 0o666 & ~UMASK
+        os.chmod(tmp_name, mode)
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+    fsync_directory(path.parent)
+
+
+def open_storage(api):
+    """
+    The backend chosen by the storage_backend setting.
+
+    "auto" (the default) works on local files when vault_root is available
+    on this machine (see ObsidianAPI.get_local_vault_root) and uses the REST
+    API otherwise; "local" and "rest" force one or the other.
+    """
+    backend = api.settings.get('storage_backend', 'auto')
+    if backend not in ('auto', 'local', 'rest'):
+        raise ValueError(f"storage_backend must be 'auto', 'local' or 'rest', not '{backend}'")
+    if backend == 'rest':
+        return RestStorage(api)
+    root = api.get_local_vault_root()
+    if root is None:
+        if backend == 'local':
+            raise ValueError("storage_backend is 'local' but vault_root isn't available on this machine "
+                             "(or local_vault_access is false)")
+        return RestStorage(api)
+    return LocalStorage(api, root)
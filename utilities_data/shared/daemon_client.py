@@ -0,0 +1,93 @@
+"""
+vaultd client - hands a command line to the running vaultd over its Unix socket and relays the output
+"""
+
+import json
+import os
+import socket
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+# Override the socket location, or set NO_DAEMON to always run in-process
+SOCKET_ENV = 'OBSIDIAN_UTILITIES_SOCKET'
+NO_DAEMON_ENV = 'OBSIDIAN_UTILITIES_NO_DAEMON'
+
+
+def socket_path() -> Path:
+    """Where vaultd listens: $OBSIDIAN_UTILITIES_SOCKET, else under $XDG_RUNTIME_DIR or ~/.cache/obsidian-utilities"""
+    override = os.environ.get(SOCKET_ENV)
+    if override:
+        return Path(override)
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    base = Path(runtime_dir) if runtime_dir else Path.home() / '.cache' / 'obsidian-utilities'
+    return base / 'vaultd.sock'
+
+
+def connect(path: Optional[Path] = None) -> Optional[socket.socket]:
+    """Connect to vaultd, or return None if it isn't running"""
+    path = path or socket_path()
+    if not hasattr(socket, 'AF_UNIX') or not path.exists():
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(str(path))
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+
+def send_message(sock: socket.socket, message: dict):
+    sock.sendall(json.dumps(message).encode('utf-8') + b'\n')
+
+
+def forward_to_daemon(tool: str, argv: Optional[List[str]] = None):
+    """
+    Run this invocation in vaultd if it's running, then exit with its status.
+
+    Returns (so the caller carries on in-process) when the daemon isn't
+    running, can't be reached, or declines the request before producing any
+    output. Output is relayed as it arrives.
+    """
+    if os.environ.get(NO_DAEMON_ENV):
+        return
+    sock = connect()
+    if sock is None:
+        return
+
+    try:
+        send_message(sock, {'tool': tool, 'argv': sys.argv[1:] if argv is None else argv, 'cwd': os.getcwd()})
+    except OSError:
+        sock.close()
+        return
+
+    started = False
+    try:
+        replies = sock.makefile('rb')
+        for line in replies:
+            reply = json.loads(line)
+            if 'fallback' in reply:
+                return
+            if 'exit' in reply:
+                sys.stdout.flush()
+                sys.exit(reply['exit'])
+            started = True
+            stream = sys.stdout if reply.get('stream') == 'stdout' else sys.stderr
+            stream.write(reply['data'])
+            if reply.get('flush'):
+                stream.flush()
+    except BrokenPipeError:
+        # Downstream (e.g. head) stopped reading; don't let Python complain while flushing at exit
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(0)
+    except (OSError, ValueError):
+        # The daemon went away; only safe to fall back if nothing was printed yet
+        pass
+    finally:
+        sock.close()
+
+    if not started:
+        return
+    print("Error: lost connection to vaultd", file=sys.stderr)
+    sys.exit(1)
@@ -0,0 +1,172 @@
+"""
+Shared frontmatter scanning for mdquery and mdget - header-only YAML extraction and process-pool dispatch
+"""
+
+import os
+import stat
+import yaml
+from functools import partial
+from multiprocessing import Pool
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+
+# Front matter larger than this is treated as an error rather than read further
+DEFAULT_MAX_FRONTMATTER_BYTES = 1024 * 1024
+
+OPENING_DELIMITERS = (b'---\n', b'---\r\n')
+CLOSING_DELIMITERS = OPENING_DELIMITERS + (b'---',)  # closing --- may end the file
+CLOSING_READ_BYTES = max(len(delimiter) for delimiter in CLOSING_DELIMITERS)
+UTF8_BOM = b'\xef\xbb\xbf'
+
+# libyaml's loader (when PyYAML was built with it) accepts the same safe subset several times faster
+SafeLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+
+class FrontmatterTooLarge(ValueError):
+    """Raised when no closing --- is found within the byte cap"""
+
+
+def read_frontmatter_block(file_path, max_bytes: int = DEFAULT_MAX_FRONTMATTER_BYTES) -> Optional[str]:
+    """
+    Return the raw YAML between the opening and closing --- lines, or None.
+
+    Reads line by line through a buffered binary handle and stops at the
+    closing delimiter, so the note body is never read or decoded. Accepts
+    LF and CRLF line endings, a leading UTF-8 BOM and a closing --- at EOF
+    without a trailing newline. A header that isn't closed is not front matter.
+    """
+    with open(file_path, 'rb') as f:
+        first_line = f.readline(len(UTF8_BOM) + 6)
+        if first_line.startswith(UTF8_BOM):
+            first_line = first_line[len(UTF8_BOM):]
+        if first_line not in OPENING_DELIMITERS:
+            return None
+
+        lines = []
+        remaining = max_bytes
+        while True:
+            # Bounded readline: a single huge line can't blow past the cap. The
+            # limit leaves room for a whole closing delimiter, which doesn't count
+            # against the cap, so a cut-off line can never look like one
+            line = f.readline(remaining + CLOSING_READ_BYTES)
+            if not line:
+                return None
+            if line in CLOSING_DELIMITERS:
+                return b''.join(lines).decode('utf-8')
+            remaining -= len(line)
+            if remaining < 0:
+                raise FrontmatterTooLarge(f"front matter exceeds {max_bytes} bytes")
+            lines.append(line)
+
+
+def load_properties(yaml_content: str, properties: Iterable[str]) -> Any:
+    """
+    Parse front matter, building Python values only for the given top-level properties.
+
+    The whole header is still parsed (so syntax errors are reported as
+    usual), but constructing values is most of the cost of a load, and
+    properties nobody asked for are skipped. Front matter that isn't a
+    mapping is loaded whole.
+    """
+    loader = SafeLoader(yaml_content)
+    try:
+        node = loader.get_single_node()
+        if node is None:
+            return None
+        if not isinstance(node, yaml.MappingNode):
+            return loader.construct_document(node)
+        loader.flatten_mapping(node)  # apply << merge keys first
+        wanted = set(properties)
+        data = {}
+        for key_node, value_node in node.value:
+            if not isinstance(key_node, yaml.ScalarNode):
+                continue
+            key = loader.construct_object(key_node)
+            if key in wanted:
+                data[key] = loader.construct_object(value_node, deep=True)
+        return data
+    finally:
+        loader.dispose()
+
+
+def extract_yaml_frontmatter(file_path, max_bytes: int = DEFAULT_MAX_FRONTMATTER_BYTES,
+                             properties: Optional[Iterable[str]] = None) -> Optional[Dict[str, Any]]:
+    """Extract YAML front matter from a markdown file (only the given properties, if any are given)"""
+    try:
+        yaml_content = read_frontmatter_block(file_path, max_bytes)
+        if yaml_content is None:
+            return None
+        if properties is not None:
+            return load_properties(yaml_content, properties)
+        return yaml.load(yaml_content, Loader=SafeLoader)
+
+    except Exception as e:
+        raise Exception(f"Failed to parse YAML: {e}")
+
+
+def scan_file(file_path: str, check_file: bool = False, max_bytes: int = DEFAULT_MAX_FRONTMATTER_BYTES,
+              properties: Optional[Tuple[str, ...]] = None) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    Worker entry point: parse one file and return (yaml_data, error).
+
+    Errors are returned as strings rather than raised so a single bad file
+    doesn't tear down a pool, and callers can report them in scan order.
+    With properties, yaml_data only holds those of them the file has.
+    """
+    try:
+        if check_file:
+            # One stat instead of Path.exists() and Path.is_file()
+            try:
+                mode = os.stat(file_path).st_mode
+            except FileNotFoundError:
+                raise FileNotFoundError(f"File not found: {file_path}")
+            if not stat.S_ISREG(mode):
+                raise ValueError(f"Path is not a file: {file_path}")
+        return extract_yaml_frontmatter(file_path, max_bytes, properties), None
+    except Exception as e:
+        return None, str(e)
+
+
+def resolve_jobs(jobs: int) -> int:
+    """Translate a --jobs value into a worker count (0 means one per CPU)"""
+    if jobs <= 0:
+        return os.cpu_count() or 1
+    return jobs
+
+
+def _call_indexed(func: Callable, indexed_item: Tuple[int, Any]) -> Tuple[int, Any]:
+    index, item = indexed_item
+    return index, func(item)
+
+
+def map_files(func: Callable, items: Iterable[Any], jobs: int = 1,
+              chunksize: Optional[int] = None, ordered: bool = True) -> Iterator[Tuple[int, Any]]:
+    """
+    Apply func to every item, yielding (index, result) pairs.
+
+    With jobs == 1 (or a single item) this runs in-process. Otherwise items are
+    dispatched to a process pool in chunks; ordered=True yields results in input
+    order as they become available, ordered=False yields them as workers finish
+    (callers use the index to put them back in place).
+
+    func must be a module-level function (or functools.partial of one) so it
+    can be pickled for the workers.
+    """
+    items = list(items)
+    jobs = min(resolve_jobs(jobs), len(items))
+
+    if jobs <= 1:
+        for index, item in enumerate(items):
+            yield index, func(item)
+        return
+
+    if chunksize is None:
+        # A few chunks per worker keeps the pool balanced without paying
+        # pickling overhead on every file
+        chunksize = max(1, min(512, len(items) // (jobs * 4)))
+
+    with Pool(jobs) as pool:
+        if ordered:
+            yield from enumerate(pool.imap(func, items, chunksize))
+        else:
+            yield from pool.imap_unordered(partial(_call_indexed, func), enumerate(items), chunksize)
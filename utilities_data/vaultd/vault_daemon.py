@@ -0,0 +1,312 @@
+"""
+vaultd server - runs mdquery, mdget and obsidian_query in one long-lived process with their vault state kept hot
+"""
+
+import importlib.machinery
+import importlib.util
+import json
+import os
+import socket
+import sqlite3
+import sys
+import time
+import traceback
+from pathlib import Path
+from types import ModuleType
+from typing import Dict, List, Tuple
+
+from vault_watcher import VaultWatcher
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent.parent / "executable_scripts"
+SETTINGS_FILE = Path(__file__).resolve().parent.parent / "obsidian_mv" / "settings.json"
+TOOLS = ('mdquery', 'mdget', 'obsidian_query')
+
+# Folders kept scanned in memory at once; the least recently queried is dropped first
+MAX_HOT_FOLDERS = 4
+# Output is sent to the client in chunks of about this size (and on every flush)
+RELAY_CHUNK = 64 * 1024
+
+
+class Relay:
+    """
+    Stands in for sys.stdout/sys.stderr while a tool runs, forwarding what it
+    writes to the client as JSON lines. stdout is buffered in chunks; stderr
+    is sent immediately, after any pending stdout, so the two stay in order.
+    """
+
+    def __init__(self, conn: socket.socket):
+        self.conn = conn
+        self.stdout = RelayStream(self, 'stdout')
+        self.stderr = RelayStream(self, 'stderr')
+
+    def send(self, message: Dict):
+        self.conn.sendall(json.dumps(message).encode('utf-8') + b'\n')
+
+
+class RelayStream:
+    encoding = 'utf-8'
+    errors = 'strict'
+
+    def __init__(self, relay: Relay, name: str):
+        self.relay = relay
+        self.name = name
+        self.pending: List[str] = []
+        self.size = 0
+
+    def write(self, text: str) -> int:
+        if self.name == 'stderr':
+            self.relay.stdout.flush()
+        self.pending.append(text)
+        self.size += len(text)
+        if self.name == 'stderr' or self.size >= RELAY_CHUNK:
+            self._send(False)
+        return len(text)
+
+    def _send(self, flush: bool):
+        if self.pending or flush:
+            self.relay.send({'stream': self.name, 'data': ''.join(self.pending), 'flush': flush})
+            self.pending = []
+            self.size = 0
+
+    def flush(self):
+        self._send(True)
+
+    def isatty(self) -> bool:
+        return False
+
+    def fileno(self) -> int:
+        raise OSError("vaultd output has no file descriptor")
+
+
+class HotFolder:
+    """One folder scanned by mdquery, kept current from its file watcher."""
+
+    def __init__(self, mdquery: ModuleType, args, index_text: bool):
+        self.directory = os.path.abspath(args.directory)
+        # Watch first so changes made during the initial scan aren't missed
+        self.watcher = VaultWatcher(self.directory)
+        self.mq = mdquery.MarkdownQuery(self.directory, args.recursive, args.pattern, mdquery.open_cache(args),
+                                        args.jobs, args.max_frontmatter_bytes, index_text=index_text)
+        self.mq.rescan()
+        self.last_used = time.time()
+
+    def refresh(self):
+        changes = self.watcher.drain()
+        if changes:
+            self.mq.rescan(None if changes.rescan else changes.paths)
+        self.last_used = time.time()
+
+    def close(self):
+        self.watcher.close()
+        if self.mq.cache is not None:
+            self.mq.cache.close()
+
+
+class VaultDaemon:
+    """
+    Serves tool invocations over a Unix socket, one at a time.
+
+    Each request is {"tool", "argv", "cwd"}; the tool's main() runs in this
+    process with its output relayed back, followed by {"exit": status}.
+    Control requests ({"control": "status" | "stop"}) get one JSON reply.
+    """
+
+    def __init__(self, socket_path: Path, index_text: bool = False):
+        self.socket_path = Path(socket_path)
+        self.index_text = index_text
+        self.started = time.time()
+        self.requests = 0
+        self.running = False
+        self.tools: Dict[str, ModuleType] = {}
+        self.folders: Dict[Tuple, HotFolder] = {}
+        self.api = None
+        self.api_settings_mtime = None
+        self.api_watcher = None
+        self._base_path = list(sys.path)
+
+    # Tool loading
+
+    def load_tool(self, tool: str) -> ModuleType:
+        """Import an executable script as a module (once)."""
+        if tool not in self.tools:
+            # Each script puts its own utilities_data folders on sys.path, and mdquery
+            # and mdget each have a module named 'formatters'; load every tool against
+            # a clean path so it binds its own
+            saved_path = list(sys.path)
+            sys.path[:] = self._base_path
+            sys.modules.pop('formatters', None)
+            try:
+                loader = importlib.machinery.SourceFileLoader(f"vaultd_{tool}", str(SCRIPTS_DIR / tool))
+                module = importlib.util.module_from_spec(importlib.util.spec_from_loader(loader.name, loader))
+                loader.exec_module(module)
+            finally:
+                added = [p for p in sys.path if p not in saved_path]
+                sys.path[:] = saved_path + added
+            self.tools[tool] = module
+        return self.tools[tool]
+
+    # Hot state
+
+    def hot_folder(self, mdquery: ModuleType, args) -> HotFolder:
+        key = (os.path.abspath(args.directory), args.recursive, args.pattern, args.max_frontmatter_bytes,
+               args.no_cache, os.path.abspath(args.cache_file) if args.cache_file else None)
+        folder = self.folders.get(key)
+        if folder is not None and args.rebuild_cache:
+            folder.close()
+            del self.folders[key]
+            folder = None
+        if folder is None:
+            if len(self.folders) >= MAX_HOT_FOLDERS:
+                oldest = min(self.folders, key=lambda k: self.folders[k].last_used)
+                self.folders.pop(oldest).close()
+            folder = HotFolder(mdquery, args, self.index_text)
+            self.folders[key] = folder
+        else:
+            folder.refresh()
+        return folder
+
+    def scan_hot(self, mdquery: ModuleType):
+        """mdquery's scan hook: the hot MarkdownQuery for the requested folder, brought up to date."""
+        def scan(args):
+            try:
+                folder = self.hot_folder(mdquery, args)
+            except sqlite3.Error as e:
+                print(f"Warning: Could not update frontmatter cache: {e}", file=sys.stderr)
+                return mdquery.scan_collection(args)
+            except Exception as e:
+                print(f"Error scanning files: {e}", file=sys.stderr)
+                sys.exit(1)
+
+            # Report unreadable files the way a fresh scan would, relative to the client's --directory
+            base = str(Path(args.directory))
+            for relative_path, error in folder.mq.errors:
+                file_path = relative_path if base == '.' else os.path.join(base, relative_path)
+                print(f"Warning: Error processing {file_path}: {error}", file=sys.stderr)
+            return folder.mq
+        return scan
+
+    def obsidian_api(self, obsidian_query: ModuleType):
+        """The shared ObsidianAPI client, told to look at the vault again if it may have changed."""
+        try:
+            settings_mtime = os.stat(SETTINGS_FILE).st_mtime_ns
+        except OSError:
+            settings_mtime = None
+        if self.api is None or settings_mtime != self.api_settings_mtime:
+            try:
+                self.api = obsidian_query.ObsidianAPI()
+            except (FileNotFoundError, ValueError):
+                # Let obsidian_query report the problem itself
+                self.api = None
+                return None
+            self.api_settings_mtime = settings_mtime
+            if self.api_watcher is not None:
+                self.api_watcher.close()
+            vault_root = self.api.get_local_vault_root()
+            self.api_watcher = VaultWatcher(str(vault_root)) if vault_root else None
+            return self.api
+
+        # Without a watched local vault, anything may have changed since the last query
+        if self.api_watcher is None or self.api_watcher.drain():
+            self.api.forget_vault_state()
+        return self.api
+
+    def run_tool(self, tool: str, argv: List[str]):
+        module = self.load_tool(tool)
+        if tool == 'mdquery':
+            module.main(argv, scan=self.scan_hot(module))
+        elif tool == 'obsidian_query':
+            module.main(argv, api=self.obsidian_api(module))
+        else:
+            module.main(argv)
+
+    # Requests
+
+    def status(self) -> Dict:
+        return {
+            'pid': os.getpid(),
+            'socket': str(self.socket_path),
+            'uptime_seconds': round(time.time() - self.started, 1),
+            'requests': self.requests,
+            'folders': [{
+                'directory': folder.directory,
+                'files_with_yaml': len(folder.mq.files_data),
+                'watching': folder.watcher.available
+            } for folder in self.folders.values()],
+            'obsidian_api': self.api.api_base_url if self.api else None
+        }
+
+    def handle(self, conn: socket.socket):
+        request = json.loads(conn.makefile('rb').readline() or b'null')
+        relay = Relay(conn)
+        if not isinstance(request, dict):
+            return
+        if 'control' in request:
+            if request['control'] == 'stop':
+                self.running = False
+            relay.send(self.status())
+            return
+
+        tool = request.get('tool')
+        if tool not in TOOLS:
+            relay.send({'fallback': f"unknown tool {tool!r}"})
+            return
+        self.requests += 1
+
+        argv = list(request.get('argv', []))
+        saved = sys.stdout, sys.stderr, sys.argv, os.getcwd()
+        code = 0
+        try:
+            os.chdir(request.get('cwd') or '/')
+            sys.stdout, sys.stderr = relay.stdout, relay.stderr
+            sys.argv = [tool] + argv
+            try:
+                self.run_tool(tool, argv)
+            except SystemExit as e:
+                if e.code is None:
+                    code = 0
+                elif isinstance(e.code, int):
+                    code = e.code
+                else:
+                    print(e.code, file=sys.stderr)
+                    code = 1
+            except (BrokenPipeError, ConnectionError):
+                # Client went away (e.g. output piped into head)
+                return
+            except Exception:
+                traceback.print_exc()
+                code = 1
+            relay.stdout.flush()
+            relay.send({'exit': code})
+        finally:
+            sys.stdout, sys.stderr, sys.argv = saved[:3]
+            os.chdir(saved[3])
+
+    def serve_forever(self):
+        if self.socket_path.exists():
+            self.socket_path.unlink()
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o077)  # only this user may connect
+        try:
+            server.bind(str(self.socket_path))
+        finally:
+            os.umask(old_umask)
+        server.listen(16)
+        self.running = True
+        print(f"vaultd {os.getpid()} listening on {self.socket_path}", flush=True)
+        try:
+            while self.running:
+                conn, _ = server.accept()
+                with conn:
+                    try:
+                        self.handle(conn)
+                    except (OSError, ValueError) as e:
+                        print(f"request failed: {e}", file=sys.__stderr__, flush=True)
+        finally:
+            server.close()
+            try:
+                self.socket_path.unlink()
+            except OSError:
+                pass
+            for folder in self.folders.values():
+                folder.close()
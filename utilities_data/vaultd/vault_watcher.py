@@ -0,0 +1,158 @@
+"""
+Filesystem change tracking for vaultd - recursive inotify watches via ctypes, with a "rescan everything" fallback
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import struct
+from typing import Dict, Optional, Set
+
+# inotify(7) event bits
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+IN_NONBLOCK = 0o4000
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+              IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+EVENT_HEADER = struct.Struct('iIII')
+
+
+class Changes:
+    """
+    Changes accumulated since the last drain.
+
+    Attributes:
+        paths: Relative paths of files that were written, created or removed
+        rescan: Something happened that can't be described per file (a
+            directory appeared or vanished, events were lost, or no watcher
+            is running), so callers must re-list everything
+    """
+
+    def __init__(self, paths: Optional[Set[str]] = None, rescan: bool = False):
+        self.paths = paths or set()
+        self.rescan = rescan
+
+    def __bool__(self):
+        return self.rescan or bool(self.paths)
+
+
+class VaultWatcher:
+    """
+    Recursively watch a directory tree with inotify.
+
+    The kernel queues events as files change; drain() reads everything queued
+    so far (without blocking) and folds it into a Changes set. Reading at
+    query time rather than from a background thread means a write that
+    finished before the query is always seen. If the queue overflows between
+    drains, a rescan is reported. When inotify isn't available (not Linux, or
+    out of watches) every drain reports a rescan, so callers stay correct,
+    just slower.
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        self.available = False
+        self._watches: Dict[int, str] = {}
+        self._fd = -1
+        self._libc = None
+
+        libc_name = ctypes.util.find_library('c')
+        if libc_name is None:
+            return
+        try:
+            libc = ctypes.CDLL(libc_name, use_errno=True)
+            fd = libc.inotify_init1(IN_CLOEXEC | IN_NONBLOCK)
+        except (OSError, AttributeError):
+            return
+        if fd < 0:
+            return
+        self._libc = libc
+        self._fd = fd
+        if not self._watch_tree(self.root):
+            self.close()
+            return
+
+        self.available = True
+
+    def _add_watch(self, directory: str) -> bool:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK | IN_ONLYDIR)
+        if wd < 0:
+            return False
+        self._watches[wd] = directory
+        return True
+
+    def _watch_tree(self, top: str) -> bool:
+        """Watch top and every directory below it; False if the kernel refused (e.g. watch limit)"""
+        if not self._add_watch(top):
+            return False
+        for directory, subdirs, _ in os.walk(top):
+            for name in subdirs:
+                if not self._add_watch(os.path.join(directory, name)):
+                    return False
+        return True
+
+    def _handle(self, data: bytes, changes: Changes):
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _, name_len = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + name_len].rstrip(b'\0'))
+            offset += name_len
+
+            if mask & IN_Q_OVERFLOW:
+                changes.rescan = True
+                continue
+            directory = self._watches.get(wd)
+            if mask & IN_IGNORED:
+                self._watches.pop(wd, None)
+                continue
+            if directory is None:
+                continue
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                changes.rescan = True
+                continue
+
+            path = os.path.join(directory, name)
+            if mask & IN_ISDIR:
+                # New folders need their own watches; either way the file list changed
+                if mask & (IN_CREATE | IN_MOVED_TO) and not self._watch_tree(path):
+                    self.available = False
+                changes.rescan = True
+            else:
+                changes.paths.add(os.path.relpath(path, self.root))
+
+    def drain(self) -> Changes:
+        """Return everything that changed since the last drain"""
+        if not self.available:
+            return Changes(rescan=True)
+        changes = Changes()
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except OSError as e:
+                if e.errno != errno.EAGAIN:
+                    changes.rescan = True
+                break
+            if not data:
+                break
+            self._handle(data, changes)
+        return changes
+
+    def close(self):
+        fd, self._fd = self._fd, -1
+        if fd >= 0:
+            os.close(fd)